@@ -1,43 +1,105 @@
+from django.conf import settings
 from django.contrib import admin
-from django.db.models import Count
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
 
 from .models import (
     CustomUser,
     Ingredient,
+    Job,
     Recipe,
+    RecipeIngredients,
     Subscribe,
     Tag,
     Unit,
 )
 
 
+class EstimatedCountPaginator(Paginator):
+    """Для списка без фильтров берёт число строк из статистики PostgreSQL.
+
+    Точный COUNT(*) по большой таблице читает её целиком; reltuples
+    обновляется автоочисткой и ANALYZE и для пагинации достаточно точен.
+    Маленькие таблицы и отфильтрованные списки считаются точно.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if queryset.query.where:
+            return super().count
+        estimate = self.get_estimate(queryset)
+        if estimate < settings.ADMIN_ESTIMATED_COUNT_THRESHOLD:
+            return super().count
+        return estimate
+
+    @staticmethod
+    def get_estimate(queryset):
+        connection = connections[queryset.db]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class '
+                'WHERE oid = %s::regclass',
+                (connection.ops.quote_name(queryset.model._meta.db_table),)
+            )
+            row = cursor.fetchone()
+        return row[0] if row else -1
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
 @admin.register(CustomUser)
-class CustomUserAdmin(admin.ModelAdmin):
+class CustomUserAdmin(LargeTableAdmin):
     search_fields = ('username', 'email')
+    list_display = ('username', 'email', 'recipes_count', 'subscribers_count')
+
+
+class RecipeIngredientsInline(admin.TabularInline):
+    model = RecipeIngredients
+    raw_id_fields = ('ingredient',)
+    extra = 0
 
 
 @admin.register(Recipe)
-class RecipeAdmin(admin.ModelAdmin):
+class RecipeAdmin(LargeTableAdmin):
     search_fields = ('name', 'author__username')
     list_filter = ('tags',)
+    list_display = ('name', 'author', 'favorites_count')
+    list_select_related = ('author',)
+    autocomplete_fields = ('author', 'tags')
+    inlines = (RecipeIngredientsInline,)
 
-    def get_queryset(self, request):
-        queryset = super().get_queryset(request)
-        return queryset.annotate(favorite_count=Count('favorited_by'))
 
-    def favorite_count(self, obj):
-        return obj.favorite_count
+@admin.register(Ingredient)
+class IngredientAdmin(LargeTableAdmin):
+    search_fields = ('name',)
+    list_display = ('name', 'measurement_unit')
+    list_select_related = ('measurement_unit',)
+    autocomplete_fields = ('measurement_unit',)
 
-    favorite_count.short_description = 'Добавлен в избранное (раз)'
 
-    list_display = ('name', 'author', 'favorite_count')
+@admin.register(Unit)
+class UnitAdmin(admin.ModelAdmin):
+    search_fields = ('title',)
 
 
-@admin.register(Ingredient)
-class IngredientAdmin(admin.ModelAdmin):
-    search_fields = ('name',)
+@admin.register(Tag)
+class TagAdmin(admin.ModelAdmin):
+    search_fields = ('name', 'slug')
+
+
+@admin.register(Subscribe)
+class SubscribeAdmin(LargeTableAdmin):
+    list_display = ('subscriber', 'subscribed_to')
+    list_select_related = ('subscriber', 'subscribed_to')
+    autocomplete_fields = ('subscriber', 'subscribed_to')
 
 
-admin.site.register(Unit)
-admin.site.register(Tag)
-admin.site.register(Subscribe)
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'status', 'priority', 'attempts', 'run_at')
+    list_filter = ('status', 'name')
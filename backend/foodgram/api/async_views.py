@@ -0,0 +1,47 @@
+import functools
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.urls import re_path
+
+from .db import check_connections
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def read_view(view):
+    """Асинхронная обёртка над синхронным видом DRF для ASGI.
+
+    В Django 3.2 нет асинхронного ORM, а все синхронные виды под ASGI
+    выполняются в одном общем потоке процесса. Читающие запросы уходят
+    в пул потоков, поэтому один процесс обслуживает много медленных
+    клиентов сразу; ответы те же, что у синхронного вида.
+    """
+    def handle(request, *args, **kwargs):
+        close_old_connections()
+        check_connections()
+        try:
+            response = view(request, *args, **kwargs)
+            if hasattr(response, 'render'):
+                response.render()
+            return response
+        finally:
+            close_old_connections()
+
+    handle_read = sync_to_async(handle, thread_sensitive=False)
+    handle_write = sync_to_async(view, thread_sensitive=True)
+
+    @functools.wraps(view)
+    async def async_view(request, *args, **kwargs):
+        if request.method in SAFE_METHODS:
+            return await handle_read(request, *args, **kwargs)
+        return await handle_write(request, *args, **kwargs)
+    return async_view
+
+
+def async_read_urls(urls, names):
+    return [
+        re_path(str(url.pattern), read_view(url.callback), name=url.name)
+        if url.name in names else url
+        for url in urls
+    ]
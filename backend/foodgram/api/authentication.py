@@ -0,0 +1,50 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+TOKEN_CACHE_KEY = 'auth:token:{}'
+# Эти поля не попадают в кеш: хеш пароля не должен лежать в нём, а
+# счётчики меняются без сохранения пользователя. Отложенные поля
+# user.save() не записывает, поэтому устаревшие значения не вернутся
+# в базу; при чтении они загружаются отдельным запросом.
+UNCACHED_USER_FIELDS = ('password', 'recipes_count', 'subscribers_count')
+
+
+def get_token_cache_key(key):
+    return TOKEN_CACHE_KEY.format(hashlib.sha256(key.encode()).hexdigest())
+
+
+def forget_tokens(*keys):
+    cache.delete_many([get_token_cache_key(key) for key in keys])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Токен вместе с пользователем хранится в кеше AUTH_TOKEN_CACHE_TIMEOUT.
+
+    Запись удаляется при выходе, смене токена и изменении пользователя,
+    в том числе пароля. Поля UNCACHED_USER_FIELDS не кешируются.
+    """
+
+    def authenticate_credentials(self, key):
+        cache_key = get_token_cache_key(key)
+        token = cache.get(cache_key)
+        if token is None:
+            try:
+                token = self.get_model().objects.select_related(
+                    'user'
+                ).defer(
+                    *(f'user__{field}' for field in UNCACHED_USER_FIELDS)
+                ).get(key=key)
+            except self.get_model().DoesNotExist:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+            if token.user.is_active:
+                cache.set(cache_key, token, settings.AUTH_TOKEN_CACHE_TIMEOUT)
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.')
+            )
+        return token.user, token
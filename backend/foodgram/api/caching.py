@@ -0,0 +1,83 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+
+CATALOG_VERSION_KEY = 'catalog:version'
+RECIPE_LIST_VERSION_KEY = 'recipes:list:version'
+RECIPE_VERSION_KEY = 'recipes:{}:version'
+
+
+def get_versions(*keys):
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            versions[key] = cache.get_or_set(key, time.time_ns, timeout=None)
+    return [versions[key] for key in keys]
+
+
+def bump_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+def bump_recipe_versions(*recipe_ids):
+    for recipe_id in recipe_ids:
+        bump_version(RECIPE_VERSION_KEY.format(recipe_id))
+    bump_version(RECIPE_LIST_VERSION_KEY)
+
+
+def normalize_query(query_params):
+    return '&'.join(
+        f'{key}={value}'
+        for key in sorted(query_params)
+        for value in sorted(query_params.getlist(key))
+    )
+
+
+class AnonymousResponseCacheMixin:
+    """Кеш ответов list/retrieve для анонимных пользователей.
+
+    Ключ включает версию списка или рецепта и версию справочников,
+    поэтому при изменениях старые записи просто перестают читаться.
+    """
+
+    def get_response_cache_key(self, request):
+        if self.action == 'list':
+            version_key = RECIPE_LIST_VERSION_KEY
+        else:
+            version_key = RECIPE_VERSION_KEY.format(self.kwargs['pk'])
+        versions = get_versions(version_key, CATALOG_VERSION_KEY)
+        query = hashlib.md5(
+            normalize_query(request.query_params).encode('utf-8')
+        ).hexdigest()
+        return 'recipes:{}:{}:{}:{}:{}'.format(
+            self.action,
+            self.kwargs.get('pk', ''),
+            '.'.join(map(str, versions)),
+            request.get_host(),
+            query
+        )
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return handler(request, *args, **kwargs)
+        key = self.get_response_cache_key(request)
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+        response = handler(request, *args, **kwargs)
+        cache.set(key, response.data, settings.RECIPE_CACHE_TIMEOUT)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
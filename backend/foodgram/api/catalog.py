@@ -0,0 +1,68 @@
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+from .caching import CATALOG_VERSION_KEY, bump_version, get_versions
+
+_catalog = {}
+
+
+def get_catalog_version():
+    return get_versions(CATALOG_VERSION_KEY)[0]
+
+
+def bump_catalog_version():
+    bump_version(CATALOG_VERSION_KEY)
+
+
+def get_catalog(name, build):
+    """Сериализованный справочник из памяти процесса.
+
+    Запись перестраивается при смене версии справочников или по истечении
+    CATALOG_CACHE_TIMEOUT: при локальном бэкенде кеша версия не видна
+    другим процессам.
+    """
+    version = get_catalog_version()
+    entry = _catalog.get(name)
+    if (
+        entry is None
+        or entry['version'] != version
+        or time.monotonic() - entry['built'] > settings.CATALOG_CACHE_TIMEOUT
+    ):
+        data = build()
+        content = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        entry = {
+            'version': version,
+            'built': time.monotonic(),
+            'data': data,
+            'etag': '"{}"'.format(hashlib.md5(content).hexdigest()),
+        }
+        _catalog[name] = entry
+    return entry
+
+
+class CatalogCacheMixin:
+    catalog_name = None
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params:
+            return super().list(request, *args, **kwargs)
+        entry = get_catalog(self.catalog_name, self.build_catalog)
+        headers = {'ETag': entry['etag']}
+        etags = [
+            etag.replace('W/', '', 1) for etag in
+            parse_etags(request.headers.get('If-None-Match', ''))
+        ]
+        if '*' in etags or entry['etag'] in etags:
+            return Response(status=status.HTTP_304_NOT_MODIFIED,
+                            headers=headers)
+        return Response(entry['data'], headers=headers)
+
+    def build_catalog(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        return list(self.get_serializer(queryset, many=True).data)
@@ -0,0 +1,57 @@
+from contextvars import ContextVar
+
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import CustomUser, Favorite, Recipe, Subscribe
+
+# Рецепты и пользователи, удаление которых идёт сейчас. Счётчики
+# удалённой строки не нужны: приёмники удаления каскадных строк
+# (избранного, подписок, рецептов автора) их не обновляют.
+_deleting = ContextVar('deleting', default=frozenset())
+
+
+def change_counter(model, pk, field, delta):
+    queryset = model.objects.filter(pk=pk)
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    queryset.update(**{field: F(field) + delta})
+
+
+def deleting_started(model, pk):
+    _deleting.set(_deleting.get() | {(model, pk)})
+
+
+def deleting_finished(model, pk):
+    _deleting.set(_deleting.get() - {(model, pk)})
+
+
+def forget_deleting(**kwargs):
+    # Удаление, прерванное ошибкой, не доходит до post_delete.
+    _deleting.set(frozenset())
+
+
+def is_deleting(model, pk):
+    return (model, pk) in _deleting.get()
+
+
+def count_related(model, field):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(total=Count('pk'))
+            .values('total')
+        ),
+        0
+    )
+
+
+def recount():
+    """Пересчитывает сохранённые счётчики по фактическим данным."""
+    Recipe.objects.update(favorites_count=count_related(Favorite, 'recipe'))
+    CustomUser.objects.update(
+        recipes_count=count_related(Recipe, 'author'),
+        subscribers_count=count_related(Subscribe, 'subscribed_to'),
+    )
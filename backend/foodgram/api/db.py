@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.db import connections
+
+
+def check_connections(**kwargs):
+    """Закрывает переиспользуемые соединения, которые перестали отвечать.
+
+    Аналог CONN_HEALTH_CHECKS из Django 4.1: постоянное соединение,
+    оборванное сервером или балансировщиком, иначе дало бы ошибку
+    первому запросу после простоя.
+    """
+    if not settings.CONN_HEALTH_CHECKS:
+        return
+    for connection in connections.all():
+        if (
+            connection.connection is not None
+            and not connection.in_atomic_block
+            and not connection.is_usable()
+        ):
+            connection.close()
@@ -0,0 +1,142 @@
+"""Лента рецептов авторов, на которых подписан пользователь.
+
+Рецепты авторов с небольшим числом подписчиков раскладываются по
+лентам при публикации (TimelineEntry). Рецепты популярных авторов
+(больше FEED_FANOUT_LIMIT подписчиков) не раскладываются: их берут
+при чтении через подписки. Обе выборки идут по индексам в порядке
+(created, id) и сливаются в одну страницу.
+"""
+import heapq
+
+from django.conf import settings
+from django.db.models import Q
+
+from .jobs import enqueue
+from .models import CustomUser, Recipe, Subscribe, TimelineEntry
+
+
+def is_popular(subscribers_count):
+    return subscribers_count > settings.FEED_FANOUT_LIMIT
+
+
+def before(position, created_field, id_field):
+    """Условие «строго раньше позиции» для порядка (-created, -id)."""
+    if position is None:
+        return Q()
+    created, pk = position
+    return Q(**{f'{created_field}__lte': created}) & (
+        Q(**{f'{created_field}__lt': created})
+        | Q(**{f'{id_field}__lt': pk})
+    )
+
+
+def get_feed_page(user, position, size):
+    """Позиции (created, id) не более size + 1 рецептов ленты после position.
+
+    Лишняя позиция показывает, что есть следующая страница.
+    """
+    fanned_out = TimelineEntry.objects.filter(
+        before(position, 'created', 'recipe_id'), user=user
+    ).order_by('-created', '-recipe_id').values_list('created', 'recipe_id')
+    popular_authors = Subscribe.objects.filter(
+        subscriber=user,
+        subscribed_to__subscribers_count__gt=settings.FEED_FANOUT_LIMIT
+    ).values('subscribed_to')
+    pulled = Recipe.objects.filter(
+        before(position, 'created', 'id'), author__in=popular_authors
+    ).order_by('-created', '-id').values_list('created', 'id')
+    merged = heapq.merge(
+        fanned_out[:size + 1], pulled[:size + 1], reverse=True
+    )
+    page, seen = [], set()
+    for created, recipe_id in merged:
+        # Автор мог стать популярным после раскладки своих рецептов.
+        if recipe_id not in seen:
+            seen.add(recipe_id)
+            page.append((created, recipe_id))
+            if len(page) > size:
+                break
+    return page
+
+
+def add_to_timelines(user_ids, recipes):
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(
+                user_id=user_id,
+                recipe_id=recipe_id,
+                author_id=author_id,
+                created=created
+            )
+            for user_id in user_ids
+            for recipe_id, author_id, created in recipes
+        ),
+        batch_size=settings.FEED_BATCH_SIZE,
+        ignore_conflicts=True
+    )
+
+
+def recent_recipes(author_id):
+    return list(
+        Recipe.objects.filter(author_id=author_id)
+        .order_by('-created', '-id')
+        .values_list('id', 'author_id', 'created')
+        [:settings.FEED_BACKFILL_SIZE]
+    )
+
+
+def fan_out_recipe(recipe_id):
+    recipe = Recipe.objects.filter(id=recipe_id).select_related(
+        'author'
+    ).first()
+    if recipe is None or is_popular(recipe.author.subscribers_count):
+        return
+    subscriber_ids = Subscribe.objects.filter(
+        subscribed_to_id=recipe.author_id
+    ).values_list('subscriber_id', flat=True)
+    add_to_timelines(
+        subscriber_ids,
+        [(recipe.id, recipe.author_id, recipe.created)]
+    )
+
+
+def fill_timeline(user_id, author_id):
+    """Свежие рецепты автора в ленту нового подписчика."""
+    author = CustomUser.objects.filter(id=author_id).first()
+    if author is None or is_popular(author.subscribers_count):
+        return
+    add_to_timelines((user_id,), recent_recipes(author_id))
+
+
+def fill_author_timelines(author_id):
+    """Раскладка рецептов автора, переставшего быть популярным."""
+    add_to_timelines(
+        Subscribe.objects.filter(subscribed_to_id=author_id)
+        .values_list('subscriber_id', flat=True),
+        recent_recipes(author_id)
+    )
+
+
+def unsubscribed(user_id, author_id):
+    """Убирает автора из ленты; раскладывает его рецепты, если он
+    перестал быть популярным."""
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+    if CustomUser.objects.filter(
+        id=author_id, subscribers_count=settings.FEED_FANOUT_LIMIT
+    ).exists():
+        enqueue('fill_author_timelines', {'author_id': author_id})
+
+
+def rebuild_timelines():
+    """Заполняет ленты заново по текущим подпискам."""
+    TimelineEntry.objects.all().delete()
+    authors = CustomUser.objects.filter(
+        subscribers_count__gt=0,
+        subscribers_count__lte=settings.FEED_FANOUT_LIMIT
+    ).values_list('id', flat=True)
+    for author_id in list(authors):
+        add_to_timelines(
+            Subscribe.objects.filter(subscribed_to_id=author_id)
+            .values_list('subscriber_id', flat=True),
+            recent_recipes(author_id)
+        )
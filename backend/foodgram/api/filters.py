@@ -12,6 +12,7 @@ class RecipeFilter(filters.FilterSet):
         field_name='tags__slug',
         lookup_expr='exact'
     )
+    search = filters.CharFilter(method='filter_search')
 
     class Meta:
         model = Recipe
@@ -23,6 +24,9 @@ class RecipeFilter(filters.FilterSet):
             return queryset.filter(favorited_by__user=user)
         return queryset
 
+    def filter_search(self, queryset, name, value):
+        return queryset.search(value)
+
     def filter_is_in_shopping_cart(self, queryset, name, value):
         user = self.request.user
         if value and user.is_authenticated:
@@ -30,8 +34,21 @@ class RecipeFilter(filters.FilterSet):
         return queryset
 
 
-class IngredientsFilter(filters.FilterSet):
-    name = filters.CharFilter(
-        field_name='name',
-        lookup_expr='icontains'
+def search_ingredients(queryset, value, limit=None):
+    """Ингредиенты, чьё название начинается с value, затем содержащие его.
+
+    Префиксная выборка идёт по индексу ingredient_name_prefix_idx.
+    Поиск по подстроке читает всю таблицу, поэтому выполняется, только
+    если префиксных совпадений меньше limit.
+    """
+    prefix = list(
+        queryset.filter(name__istartswith=value).order_by('name')[:limit]
     )
+    if limit is not None and len(prefix) >= limit:
+        return prefix
+    rest = queryset.filter(name__icontains=value).exclude(
+        name__istartswith=value
+    ).order_by('name')
+    if limit is not None:
+        rest = rest[:limit - len(prefix)]
+    return prefix + list(rest)
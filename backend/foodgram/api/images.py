@@ -0,0 +1,103 @@
+import base64
+import binascii
+import io
+import logging
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import UploadedFile
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+BASE64_CHUNK_SIZE = 64 * 1024
+IMAGE_VARIANTS = {
+    'thumbnail': (160, 160),
+    'card': (480, 480),
+    'full': (1200, 1200),
+}
+VARIANT_EXTENSIONS = {
+    'WEBP': 'webp',
+    'JPEG': 'jpg',
+}
+
+
+def decode_base64_file(encoded, name, content_type):
+    file = tempfile.SpooledTemporaryFile(
+        max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+    )
+    size = 0
+    try:
+        for start in range(0, len(encoded), BASE64_CHUNK_SIZE):
+            size += file.write(
+                base64.b64decode(encoded[start:start + BASE64_CHUNK_SIZE])
+            )
+    except binascii.Error:
+        file.close()
+        raise ValueError('Invalid base64 payload.')
+    file.seek(0)
+    return UploadedFile(
+        file=file,
+        name=name,
+        content_type=content_type,
+        size=size
+    )
+
+
+def get_variant_name(name, variant):
+    # Имя берётся целиком, с расширением: temp.png и temp.jpeg
+    # не должны делить одни и те же варианты.
+    directory, file_name = os.path.split(name)
+    extension = VARIANT_EXTENSIONS[settings.IMAGE_VARIANT_FORMAT]
+    return os.path.join(
+        directory, 'variants', f'{file_name}_{variant}.{extension}'
+    )
+
+
+def get_variant_url(image, variant):
+    # Пока задача не нарезала варианты текущей картинки, отдаётся
+    # оригинал. Хранилище при этом не опрашивается.
+    if getattr(image.instance, 'variants_image', None) == image.name:
+        return image.storage.url(get_variant_name(image.name, variant))
+    return image.url
+
+
+def delete_with_variants(storage, name):
+    """Удаляет изображение вместе со всеми его вариантами."""
+    for variant in IMAGE_VARIANTS:
+        storage.delete(get_variant_name(name, variant))
+    storage.delete(name)
+
+
+def generate_variants(image):
+    """Пересоздаёт варианты: старые файлы с тем же именем заменяются.
+
+    Возвращает False, если исходное изображение не удалось открыть.
+    """
+    image_format = settings.IMAGE_VARIANT_FORMAT
+    try:
+        file = image.storage.open(image.name, 'rb')
+    except OSError:
+        logger.exception('Не удалось открыть изображение %s', image.name)
+        return False
+    with file:
+        original = ImageOps.exif_transpose(Image.open(file))
+        if image_format == 'JPEG':
+            original = original.convert('RGB')
+        elif original.mode not in ('RGB', 'RGBA'):
+            original = original.convert('RGBA')
+        for variant, size in IMAGE_VARIANTS.items():
+            resized = original.copy()
+            resized.thumbnail(size, Image.LANCZOS)
+            buffer = io.BytesIO()
+            resized.save(
+                buffer,
+                format=image_format,
+                quality=settings.IMAGE_VARIANT_QUALITY
+            )
+            variant_name = get_variant_name(image.name, variant)
+            image.storage.delete(variant_name)
+            image.storage.save(variant_name, ContentFile(buffer.getvalue()))
+    return True
@@ -0,0 +1,106 @@
+import signal
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .models import Job
+
+_registry = {}
+ABANDONED_ERROR = 'Обработчик не завершил задачу за JOB_VISIBILITY_TIMEOUT.'
+
+
+def job(name):
+    def decorator(func):
+        _registry[name] = func
+        return func
+    return decorator
+
+
+def enqueue(name, payload=None, priority=0):
+    """Ставит задачу в очередь.
+
+    Строка создаётся в текущей транзакции, поэтому обработчики увидят
+    задачу только после коммита.
+    """
+    return Job.objects.create(
+        name=name,
+        payload=payload or {},
+        priority=priority,
+        max_attempts=settings.JOB_MAX_ATTEMPTS
+    )
+
+
+def claim_job():
+    """Берёт задачу из очереди.
+
+    Задача в статусе RUNNING с истёкшим run_at брошена упавшим
+    обработчиком. Если попытки кончились, она помечается FAILED.
+    """
+    while True:
+        now = timezone.now()
+        with transaction.atomic():
+            claimed = (
+                Job.objects
+                .select_for_update(skip_locked=True)
+                .filter(
+                    status__in=(Job.PENDING, Job.RUNNING), run_at__lte=now
+                )
+                .order_by('-priority', 'run_at')
+                .first()
+            )
+            if claimed is None:
+                return None
+            if (
+                claimed.status == Job.RUNNING
+                and claimed.attempts >= claimed.max_attempts
+            ):
+                claimed.status = Job.FAILED
+                claimed.last_error = ABANDONED_ERROR
+                claimed.save(update_fields=('status', 'last_error'))
+                continue
+            claimed.status = Job.RUNNING
+            claimed.attempts += 1
+            claimed.run_at = now + timedelta(
+                seconds=settings.JOB_VISIBILITY_TIMEOUT
+            )
+            claimed.save(update_fields=('status', 'attempts', 'run_at'))
+        return claimed
+
+
+def run_job(claimed):
+    try:
+        _registry[claimed.name](**claimed.payload)
+    except Exception:
+        claimed.last_error = traceback.format_exc()
+        if claimed.attempts >= claimed.max_attempts:
+            claimed.status = Job.FAILED
+        else:
+            claimed.status = Job.PENDING
+            claimed.run_at = timezone.now() + timedelta(
+                seconds=settings.JOB_RETRY_DELAY * 2 ** (claimed.attempts - 1)
+            )
+        claimed.save(update_fields=('status', 'run_at', 'last_error'))
+    else:
+        claimed.delete()
+
+
+def run_worker(poll_interval):
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    while not stopping:
+        claimed = claim_job()
+        if claimed is None:
+            time.sleep(poll_interval)
+            continue
+        run_job(claimed)
+    connections.close_all()
@@ -0,0 +1,87 @@
+import statistics
+import time
+from io import BytesIO
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from api.models import CustomUser, Recipe
+from api.renderers import ORJSONParser, ORJSONRenderer
+from api.serializers import RecipeSerializer, SubscribeListSerializer
+
+
+def measure(func, iterations):
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает стандартный JSON-рендерер DRF с orjson на страницах'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200)
+        parser.add_argument(
+            '--page-size', type=int, default=50,
+            help='Рецептов или подписок на странице'
+        )
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('--iterations должно быть больше нуля')
+        pages = self.get_pages(options['page_size'])
+        self.stdout.write('{:<20} {:>9} {:>11} {:>11} {:>8}'.format(
+            'страница', 'байт', 'json, мкс', 'orjson, мкс', 'ускор.'
+        ))
+        for name, data in pages:
+            self.compare(name, data, options['iterations'])
+
+    def get_pages(self, size):
+        user = CustomUser.objects.filter(subscriber__isnull=False).first()
+        if user is None or not Recipe.objects.exists():
+            raise CommandError('Нет данных, сначала выполните seed_bench')
+        request = APIRequestFactory().get('/api/recipes/')
+        request.user = user
+        context = {'request': request, 'image_variant': 'card'}
+        recipes = (
+            Recipe.objects.with_user_flags(user).with_related(user)[:size]
+        )
+        authors = CustomUser.objects.filter(
+            subscribed_to__subscriber=user
+        ).with_is_subscribed(user)[:size]
+        return (
+            ('recipes', RecipeSerializer(
+                recipes, many=True, context=context
+            ).data),
+            ('subscriptions', SubscribeListSerializer(
+                authors, many=True, context=context
+            ).data),
+        )
+
+    def compare(self, name, data, iterations):
+        stock, fast = JSONRenderer(), ORJSONRenderer()
+        content = stock.render(data)
+        if fast.render(data) != content:
+            raise CommandError(f'{name}: вывод orjson отличается')
+        if ORJSONParser().parse(BytesIO(content)) != JSONParser().parse(
+            BytesIO(content)
+        ):
+            raise CommandError(f'{name}: разбор orjson отличается')
+        for label, stock_call, fast_call in (
+            ('render', lambda: stock.render(data), lambda: fast.render(data)),
+            ('parse', lambda: JSONParser().parse(BytesIO(content)),
+             lambda: ORJSONParser().parse(BytesIO(content))),
+        ):
+            stock_time = measure(stock_call, iterations)
+            fast_time = measure(fast_call, iterations)
+            self.stdout.write(
+                '{:<20} {:>9} {:>11.1f} {:>11.1f} {:>7.1f}x'.format(
+                    f'{name} {label}', len(content), stock_time * 1e6,
+                    fast_time * 1e6, stock_time / fast_time
+                )
+            )
@@ -1,33 +1,130 @@
+import csv
 import json
 import os
+import time
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 
+from api.catalog import bump_catalog_version
 from api.models import Ingredient, Unit
 
+DEFAULT_FIXTURE = os.path.join(os.path.dirname(__file__), 'ingredients.json')
+READ_CHUNK_SIZE = 64 * 1024
+
+
+def read_json(file):
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    started = False
+    for chunk in iter(lambda: file.read(READ_CHUNK_SIZE), ''):
+        buffer = buffer[position:] + chunk
+        position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if not started and buffer[position:position + 1] == '[':
+                started = True
+                position += 1
+                continue
+            if position == len(buffer) or buffer[position] == ']':
+                break
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                break
+            yield item['name'], item['measurement_unit']
+    if buffer[position:].strip() not in ('', ']'):
+        raise CommandError('Некорректный JSON в файле {}'.format(file.name))
+
+
+def read_csv(file):
+    reader = csv.reader(file)
+    for row in reader:
+        if not row:
+            continue
+        if len(row) < 2:
+            raise CommandError(
+                'Строка {} файла {}: ожидается "название,единица", '
+                'получено {!r}'.format(reader.line_num, file.name, row)
+            )
+        yield row[0], row[1]
+
+
+READERS = {
+    '.json': read_json,
+    '.csv': read_csv,
+}
+
 
 class Command(BaseCommand):
-    help = "Help me please"
+    help = 'Загружает ингредиенты из JSON или CSV файлов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'paths',
+            nargs='*',
+            default=[DEFAULT_FIXTURE],
+            help='Файлы с ингредиентами (.json или .csv)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Количество ингредиентов в одном INSERT'
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        before = Ingredient.objects.count()
+        self.units = {}
+        for path in options['paths']:
+            reader = READERS.get(os.path.splitext(path)[1].lower())
+            if reader is None:
+                raise CommandError(f'Неизвестный формат файла: {path}')
+            with open(path, encoding='utf-8-sig', newline='') as file:
+                self.load(file, reader, options['batch_size'])
+        added = Ingredient.objects.count() - before
+        if added:
+            bump_catalog_version()
+        self.stdout.write(self.style.SUCCESS(
+            'Добавлено ингредиентов: {} за {:.2f} с'.format(
+                added, time.monotonic() - started
+            )
+        ))
+
+    def load(self, file, reader, batch_size):
+        batch = []
+        processed = 0
+        for name, unit in reader(file):
+            batch.append((name.strip(), unit.strip()))
+            if len(batch) >= batch_size:
+                processed += self.save_batch(batch)
+                self.stdout.write(f'{file.name}: обработано {processed}')
+                batch = []
+        if batch:
+            processed += self.save_batch(batch)
+            self.stdout.write(f'{file.name}: обработано {processed}')
+
+    def resolve_units(self, titles):
+        missing = set(titles) - self.units.keys()
+        if not missing:
+            return
+        Unit.objects.bulk_create(
+            [Unit(title=title) for title in missing],
+            ignore_conflicts=True
+        )
+        self.units.update(
+            Unit.objects.filter(title__in=missing).values_list('title', 'id')
+        )
 
-    def handle(self, *args, **kwargs):
-        fixture_path = os.path.join(
-            'api', 'management', 'commands', 'ingredients.json'
+    def save_batch(self, batch):
+        self.resolve_units(unit for _, unit in batch)
+        Ingredient.objects.bulk_create(
+            [
+                Ingredient(name=name, measurement_unit_id=self.units[unit])
+                for name, unit in batch
+            ],
+            ignore_conflicts=True
         )
-        self.load_json(fixture_path)
-
-    def load_json(self, file_path):
-        with open(file_path, 'r', encoding='utf-8') as file:
-            data = json.load(file)
-            ingredients = []
-            for item in data:
-                unit_title = item['measurement_unit']
-                unit, created = Unit.objects.get_or_create(title=unit_title)
-
-                ingredients.append(
-                    Ingredient(
-                        name=item['name'],
-                        measurement_unit=unit
-                    )
-                )
-            Ingredient.objects.bulk_create(ingredients)
-        self.stdout.write(self.style.SUCCESS('Successfully loaded JSON data'))
+        return len(batch)
@@ -0,0 +1,18 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.feed import rebuild_timelines
+
+
+class Command(BaseCommand):
+    help = 'Заполняет ленты подписок заново по текущим подпискам'
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        with transaction.atomic():
+            rebuild_timelines()
+        self.stdout.write(self.style.SUCCESS(
+            'Ленты заполнены за {:.2f} с'.format(time.monotonic() - started)
+        ))
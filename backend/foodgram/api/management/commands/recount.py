@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.counters import recount
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики избранного, рецептов и подписчиков'
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        with transaction.atomic():
+            recount()
+        self.stdout.write(self.style.SUCCESS(
+            'Счётчики пересчитаны за {:.2f} с'.format(
+                time.monotonic() - started
+            )
+        ))
@@ -0,0 +1,176 @@
+import json
+import os
+import platform
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.models import CustomUser, Favorite, Ingredient, Recipe, Tag
+
+from .seed_bench import USERNAME_PREFIX
+
+
+def percentile(values, percent):
+    ordered = sorted(values)
+    index = max(0, round(percent / 100 * len(ordered)) - 1)
+    return ordered[min(index, len(ordered) - 1)]
+
+
+def get_endpoints(user):
+    recipe = Recipe.objects.order_by('-favorites_count', '-id').first()
+    if recipe is None:
+        raise CommandError('Нет рецептов, сначала выполните seed_bench')
+    tags = '&'.join(
+        f'tags={slug}' for slug in
+        Tag.objects.values_list('slug', flat=True)[:2]
+    )
+    ingredient = Ingredient.objects.values_list('name', flat=True).first()
+    search = ingredient[:3] if ingredient else ''
+    return (
+        ('recipes_list_anonymous', '/api/recipes/', False),
+        ('recipes_list', '/api/recipes/', True),
+        ('recipes_list_tags', f'/api/recipes/?{tags}', True),
+        ('recipes_list_author', f'/api/recipes/?author={user.id}', True),
+        ('recipes_list_favorited', '/api/recipes/?is_favorited=1', True),
+        ('recipes_list_cursor', '/api/recipes/?cursor=&limit=6', True),
+        ('recipes_feed', '/api/recipes/feed/', True),
+        ('recipe_detail', f'/api/recipes/{recipe.id}/', True),
+        ('subscriptions', '/api/users/subscriptions/?recipes_limit=3', True),
+        ('ingredients_search', f'/api/ingredients/?name={search}', False),
+        ('download_shopping_cart',
+         '/api/recipes/download_shopping_cart/', True),
+        ('download_shopping_cart_pdf',
+         '/api/recipes/download_shopping_cart/?format=pdf', True),
+    )
+
+
+class Command(BaseCommand):
+    help = 'Замеряет время ответа и число запросов основных эндпоинтов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument(
+            '--user',
+            help='Email пользователя, от имени которого идут запросы'
+        )
+        parser.add_argument(
+            '--output',
+            help='Файл для сохранения результатов в JSON'
+        )
+        parser.add_argument(
+            '--compare',
+            help='Файл с результатами прошлого запуска для сравнения'
+        )
+        parser.add_argument('--label', default='', help='Метка запуска')
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('--iterations должно быть больше нуля')
+        user = self.get_user(options['user'])
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION='Token {}'.format(
+                Token.objects.get_or_create(user=user)[0].key
+            )
+        )
+        anonymous = APIClient()
+        results = {}
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            for name, url, auth in get_endpoints(user):
+                results[name] = self.measure(
+                    client if auth else anonymous, url,
+                    options['iterations'], options['warmup']
+                )
+        report = {
+            'label': options['label'],
+            'created': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'database': connection.vendor,
+            'iterations': options['iterations'],
+            'dataset': {
+                'users': CustomUser.objects.count(),
+                'recipes': Recipe.objects.count(),
+                'favorites': Favorite.objects.count(),
+            },
+            'endpoints': results,
+        }
+        previous = None
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as file:
+                previous = json.load(file)['endpoints']
+        self.print_report(results, previous)
+        if options['output']:
+            directory = os.path.dirname(options['output'])
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(
+                f'Результаты сохранены в {options["output"]}'
+            ))
+
+    def get_user(self, email):
+        users = CustomUser.objects.all()
+        if email:
+            users = users.filter(email=email)
+        else:
+            users = users.filter(
+                username__startswith=USERNAME_PREFIX
+            ).annotate(
+                subscriptions=Count('subscriber')
+            ).order_by('-subscriptions')
+        user = users.first()
+        if user is None:
+            raise CommandError(
+                'Пользователь не найден, сначала выполните seed_bench'
+            )
+        return user
+
+    def request(self, client, url):
+        response = client.get(url)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response
+
+    def measure(self, client, url, iterations, warmup):
+        for _ in range(warmup):
+            self.request(client, url)
+        timings = []
+        queries = []
+        for _ in range(iterations):
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                response = self.request(client, url)
+                timings.append((time.perf_counter() - started) * 1000)
+            queries.append(len(context.captured_queries))
+        return {
+            'url': url,
+            'status': response.status_code,
+            'p50_ms': round(percentile(timings, 50), 2),
+            'p95_ms': round(percentile(timings, 95), 2),
+            'mean_ms': round(statistics.mean(timings), 2),
+            'queries': max(queries),
+        }
+
+    def print_report(self, results, previous):
+        self.stdout.write('{:<30} {:>6} {:>10} {:>10} {:>8}'.format(
+            'endpoint', 'status', 'p50, ms', 'p95, ms', 'queries'
+        ))
+        for name, result in results.items():
+            line = '{:<30} {:>6} {:>10} {:>10} {:>8}'.format(
+                name, result['status'], result['p50_ms'], result['p95_ms'],
+                result['queries']
+            )
+            if previous and name in previous:
+                line += '  p50 {:+.1f}%'.format(
+                    (result['p50_ms'] / previous[name]['p50_ms'] - 1) * 100
+                )
+            self.stdout.write(line)
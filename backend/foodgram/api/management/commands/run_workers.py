@@ -0,0 +1,76 @@
+import multiprocessing
+import signal
+import time
+from multiprocessing.connection import wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from api.jobs import run_worker
+
+RESPAWN_DELAY = 1
+
+
+class Command(BaseCommand):
+    help = 'Запускает обработчики фоновых задач'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=settings.JOB_WORKERS,
+            help='Количество процессов-обработчиков'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=settings.JOB_POLL_INTERVAL,
+            help='Пауза между опросами пустой очереди, в секундах'
+        )
+
+    def handle(self, *args, **options):
+        connections.close_all()
+        poll_interval = options['poll_interval']
+        workers = [
+            self.start_worker(poll_interval)
+            for _ in range(options['processes'])
+        ]
+        self.stdout.write(self.style.SUCCESS(
+            f'Запущено обработчиков: {len(workers)}'
+        ))
+        stopping = False
+
+        def stop(signum, frame):
+            nonlocal stopping
+            stopping = True
+            for worker in workers:
+                worker.terminate()
+
+        signal.signal(signal.SIGTERM, stop)
+        try:
+            while not stopping:
+                wait([worker.sentinel for worker in workers])
+                # Пауза, чтобы не перезапускать процессы в цикле, если
+                # они падают сразу, например без базы.
+                time.sleep(RESPAWN_DELAY)
+                for index, worker in enumerate(workers):
+                    if stopping or worker.is_alive():
+                        continue
+                    self.stderr.write(
+                        f'Обработчик {worker.pid} завершился с кодом '
+                        f'{worker.exitcode}, перезапуск'
+                    )
+                    workers[index] = self.start_worker(poll_interval)
+        except KeyboardInterrupt:
+            pass
+        for worker in workers:
+            worker.join()
+
+    def start_worker(self, poll_interval):
+        worker = multiprocessing.Process(
+            target=run_worker,
+            args=(poll_interval,)
+        )
+        worker.start()
+        return worker
@@ -0,0 +1,223 @@
+import random
+import time
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import (
+    DateTimeField,
+    DurationField,
+    ExpressionWrapper,
+    F,
+    Value,
+)
+
+from api.caching import RECIPE_LIST_VERSION_KEY, bump_version
+from api.catalog import bump_catalog_version
+from api.counters import recount
+from api.feed import rebuild_timelines
+from api.models import (
+    CustomUser,
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeIngredients,
+    ShopList,
+    Subscribe,
+    Tag,
+)
+
+USERNAME_PREFIX = 'bench_'
+TAG_PREFIX = 'bench-'
+BENCH_PASSWORD = 'bench-password'
+RECIPE_INTERVAL = timedelta(minutes=7)
+
+
+def skewed_sampler(population, skew, rng):
+    """Выбор с распределением Ципфа: первые элементы популярнее."""
+    population = list(population)
+    weights = list(accumulate(
+        1 / (rank ** skew) for rank in range(1, len(population) + 1)
+    ))
+
+    def sample(count):
+        return rng.choices(population, cum_weights=weights, k=count)
+    return sample
+
+
+class Command(BaseCommand):
+    help = 'Генерирует синтетические данные для нагрузочных замеров'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument('--tags', type=int, default=10)
+        parser.add_argument(
+            '--ingredients', type=int, default=6,
+            help='Среднее число ингредиентов в рецепте'
+        )
+        parser.add_argument(
+            '--favorites', type=int, default=20,
+            help='Среднее число избранных рецептов у пользователя'
+        )
+        parser.add_argument(
+            '--carts', type=int, default=5,
+            help='Среднее число рецептов в списке покупок'
+        )
+        parser.add_argument(
+            '--subscriptions', type=int, default=10,
+            help='Среднее число подписок у пользователя'
+        )
+        parser.add_argument(
+            '--skew', type=float, default=1.1,
+            help='Показатель распределения Ципфа, 0 - равномерно'
+        )
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help='Удалить данные предыдущей генерации'
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        skew = options['skew']
+
+        bench_users = CustomUser.objects.filter(
+            username__startswith=USERNAME_PREFIX
+        )
+        if options['clear']:
+            bench_users.delete()
+            Tag.objects.filter(slug__startswith=TAG_PREFIX).delete()
+        elif bench_users.exists():
+            raise CommandError(
+                'Данные уже сгенерированы, используйте --clear'
+            )
+        ingredient_ids = list(Ingredient.objects.values_list('id', flat=True))
+        if not ingredient_ids:
+            raise CommandError('Сначала загрузите ингредиенты: load_fixtures')
+
+        users = self.create_users(options['users'])
+        tags = self.create_tags(options['tags'])
+        recipes = self.create_recipes(
+            options['recipes'], skewed_sampler(users, skew, self.rng)
+        )
+        self.link_tags(recipes, skewed_sampler(tags, skew, self.rng))
+        self.link_ingredients(
+            recipes, ingredient_ids, options['ingredients'],
+            skewed_sampler(ingredient_ids, skew, self.rng)
+        )
+
+        popular_recipes = recipes[:]
+        self.rng.shuffle(popular_recipes)
+        recipe_sampler = skewed_sampler(popular_recipes, skew, self.rng)
+        self.create_relations(
+            Favorite, users, options['favorites'], recipe_sampler,
+            lambda user, recipe: Favorite(user_id=user, recipe_id=recipe)
+        )
+        self.create_relations(
+            ShopList, users, options['carts'], recipe_sampler,
+            lambda user, recipe: ShopList(user_id=user, recipe_id=recipe)
+        )
+        self.create_relations(
+            Subscribe, users, options['subscriptions'],
+            skewed_sampler(users, skew, self.rng),
+            lambda user, author: Subscribe(
+                subscriber_id=user, subscribed_to_id=author
+            ) if user != author else None
+        )
+
+        recount()
+        rebuild_timelines()
+        bump_catalog_version()
+        bump_version(RECIPE_LIST_VERSION_KEY)
+        self.stdout.write(self.style.SUCCESS(
+            'Данные сгенерированы за {:.1f} с, пароль пользователей: {}'
+            .format(time.monotonic() - started, BENCH_PASSWORD)
+        ))
+
+    def bulk_create(self, model, objects, **kwargs):
+        created = model.objects.bulk_create(
+            objects, batch_size=self.batch_size, **kwargs
+        )
+        self.stdout.write(f'{model._meta.db_table}: {len(objects)}')
+        return created
+
+    def create_users(self, count):
+        password = make_password(BENCH_PASSWORD)
+        users = self.bulk_create(CustomUser, [
+            CustomUser(
+                username=f'{USERNAME_PREFIX}{number}',
+                email=f'{USERNAME_PREFIX}{number}@example.com',
+                first_name='Пользователь',
+                last_name=str(number),
+                password=password,
+            )
+            for number in range(count)
+        ])
+        return [user.id for user in users]
+
+    def create_tags(self, count):
+        tags = self.bulk_create(Tag, [
+            Tag(name=f'Тег {number}', slug=f'{TAG_PREFIX}{number}')
+            for number in range(count)
+        ])
+        return [tag.id for tag in tags]
+
+    def create_recipes(self, count, author_sampler):
+        recipes = self.bulk_create(Recipe, [
+            Recipe(
+                author_id=author,
+                name=f'Рецепт {number}',
+                image='recipes/bench.png',
+                text='Синтетический рецепт для нагрузочных замеров.',
+                cooking_time=self.rng.randint(5, 180),
+            )
+            for number, author in enumerate(author_sampler(count))
+        ])
+        ids = [recipe.id for recipe in recipes]
+        if ids:
+            Recipe.objects.filter(id__in=ids).update(
+                created=ExpressionWrapper(
+                    F('created') - ExpressionWrapper(
+                        Value(RECIPE_INTERVAL) * (Value(max(ids)) - F('id')),
+                        output_field=DurationField()
+                    ),
+                    output_field=DateTimeField()
+                )
+            )
+            Recipe.objects.filter(id__in=ids).update_search_vector()
+        return ids
+
+    def link_tags(self, recipes, tag_sampler):
+        through = Recipe.tags.through
+        links = []
+        for recipe in recipes:
+            for tag in set(tag_sampler(self.rng.randint(1, 3))):
+                links.append(through(recipe_id=recipe, tag_id=tag))
+        self.bulk_create(through, links)
+
+    def link_ingredients(self, recipes, ingredient_ids, average, sampler):
+        links = []
+        for recipe in recipes:
+            count = min(self.rng.randint(1, average * 2), len(ingredient_ids))
+            for ingredient in set(sampler(count)):
+                links.append(RecipeIngredients(
+                    recipe_id=recipe,
+                    ingredient_id=ingredient,
+                    amount=self.rng.randint(1, 1000),
+                ))
+        self.bulk_create(RecipeIngredients, links)
+
+    def create_relations(self, model, users, average, sampler, build):
+        objects = []
+        for user in users:
+            for target in set(sampler(self.rng.randint(0, average * 2))):
+                obj = build(user, target)
+                if obj is not None:
+                    objects.append(obj)
+        self.bulk_create(model, objects, ignore_conflicts=True)
@@ -0,0 +1,216 @@
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.multiprocess import MultiProcessCollector
+
+UNMATCHED_VIEW = 'unmatched'
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, float('inf'))
+SIZE_BUCKETS = tuple(256 * 4 ** power for power in range(9)) + (float('inf'),)
+
+REQUEST_LATENCY = Histogram(
+    'foodgram_request_duration_seconds',
+    'Время обработки запроса',
+    ('view', 'method', 'status'),
+)
+REQUEST_QUERIES = Histogram(
+    'foodgram_request_db_queries',
+    'Количество SQL-запросов на HTTP-запрос',
+    ('view', 'method'),
+    buckets=QUERY_BUCKETS,
+)
+REQUEST_DB_TIME = Histogram(
+    'foodgram_request_db_duration_seconds',
+    'Суммарное время SQL-запросов на HTTP-запрос',
+    ('view', 'method'),
+)
+RESPONSE_SIZE = Histogram(
+    'foodgram_response_size_bytes',
+    'Размер тела ответа',
+    ('view', 'method'),
+    buckets=SIZE_BUCKETS,
+)
+DB_CONNECTIONS_OPENED = Counter(
+    'foodgram_db_connections_opened',
+    'Подключения к БД; в режиме пула - выдачи соединений из пула',
+    ('alias',),
+)
+
+
+class DatabaseConnectionsCollector:
+    """Соединения на стороне PostgreSQL, общие для всех процессов."""
+
+    def collect(self):
+        with connections['default'].cursor() as cursor:
+            cursor.execute(
+                'SELECT coalesce(state, %s), count(*) FROM pg_stat_activity '
+                'WHERE datname = current_database() GROUP BY 1',
+                ('unknown',)
+            )
+            states = cursor.fetchall()
+            cursor.execute('SHOW max_connections')
+            max_connections = int(cursor.fetchone()[0])
+        server_connections = GaugeMetricFamily(
+            'foodgram_db_server_connections',
+            'Соединения с базой данных по состояниям',
+            labels=('state',)
+        )
+        for state, count in states:
+            server_connections.add_metric((state,), count)
+        yield server_connections
+        yield GaugeMetricFamily(
+            'foodgram_db_max_connections',
+            'Параметр max_connections сервера PostgreSQL',
+            value=max_connections
+        )
+
+
+DATABASE_REGISTRY = CollectorRegistry(auto_describe=False)
+DATABASE_REGISTRY.register(DatabaseConnectionsCollector())
+
+
+def get_view_name(view_func, method):
+    """Метка вида: класс DRF и действие, например RecipeViewSet.list."""
+    view_class = getattr(view_func, 'cls', None)
+    if view_class is None:
+        return f'{view_func.__module__}.{view_func.__name__}'
+    actions = getattr(view_func, 'actions', None)
+    if actions:
+        return '{}.{}'.format(
+            view_class.__name__, actions.get(method.lower(), method.lower())
+        )
+    return view_class.__name__
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - started
+
+
+current_query_counter = ContextVar('current_query_counter', default=None)
+
+
+def track_queries(execute, sql, params, many, context):
+    counter = current_query_counter.get()
+    if counter is None:
+        return execute(sql, params, many, context)
+    return counter(execute, sql, params, many, context)
+
+
+def install_query_tracking(connection):
+    """Постоянная обёртка SQL-запросов соединения.
+
+    Счётчик берётся из контекста запроса, а sync_to_async копирует
+    контекст в поток вида. Поэтому под ASGI учитываются и синхронные
+    виды, и записи, в каком бы потоке они ни выполнялись.
+    """
+    if track_queries not in connection.execute_wrappers:
+        # В начало списка: execute_wrapper() снимает последнюю обёртку.
+        connection.execute_wrappers.insert(0, track_queries)
+
+
+@contextmanager
+def count_queries(request):
+    token = current_query_counter.set(getattr(request, 'query_counter', None))
+    try:
+        yield
+    finally:
+        current_query_counter.reset(token)
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        started = self.start(request)
+        with count_queries(request):
+            response = self.get_response(request)
+        self.observe(request, response, started)
+        return response
+
+    async def __acall__(self, request):
+        started = self.start(request)
+        with count_queries(request):
+            response = await self.get_response(request)
+        self.observe(request, response, started)
+        return response
+
+    def start(self, request):
+        request.metrics_view = UNMATCHED_VIEW
+        request.query_counter = QueryCounter()
+        return time.perf_counter()
+
+    def observe(self, request, response, started):
+        view, method = request.metrics_view, request.method
+        REQUEST_LATENCY.labels(view, method, response.status_code).observe(
+            time.perf_counter() - started
+        )
+        REQUEST_QUERIES.labels(view, method).observe(
+            request.query_counter.count
+        )
+        REQUEST_DB_TIME.labels(view, method).observe(
+            request.query_counter.duration
+        )
+        if not response.streaming:
+            RESPONSE_SIZE.labels(view, method).observe(len(response.content))
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.metrics_view = get_view_name(view_func, request.method)
+
+
+def get_registry():
+    if not os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        return REGISTRY
+    registry = CollectorRegistry()
+    MultiProcessCollector(registry)
+    return registry
+
+
+def is_metrics_allowed(request):
+    if request.user.is_authenticated and request.user.is_staff:
+        return True
+    token = settings.METRICS_TOKEN
+    return bool(token) and constant_time_compare(
+        request.headers.get('Authorization', ''), f'Bearer {token}'
+    )
+
+
+def metrics_view(request):
+    if not is_metrics_allowed(request):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        generate_latest(get_registry()) + generate_latest(DATABASE_REGISTRY),
+        content_type=CONTENT_TYPE_LATEST
+    )
@@ -0,0 +1,20 @@
+# Generated by Django 3.2.3 on 2026-10-18 06:12
+
+import api.models
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='customuser',
+            managers=[
+                ('objects', api.models.CustomUserManager()),
+            ],
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 3.2.3 on 2026-10-18 06:20
+
+from django.db import migrations, models
+import django.db.models.expressions
+from django.db.models import Min
+
+
+def delete_duplicates(apps, schema_editor):
+    for model_name, fields in (
+        ('Favorite', ('user', 'recipe')),
+        ('ShopList', ('user', 'recipe')),
+        ('Subscribe', ('subscriber', 'subscribed_to')),
+    ):
+        model = apps.get_model('api', model_name)
+        keep = model.objects.order_by().values(*fields).annotate(
+            keep_id=Min('id')
+        )
+        model.objects.exclude(id__in=keep.values('keep_id')).delete()
+    apps.get_model('api', 'Subscribe').objects.filter(
+        subscriber=django.db.models.expressions.F('subscribed_to')
+    ).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_recipe_created_id_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='favorite',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_favorite'),
+        ),
+        migrations.AddConstraint(
+            model_name='shoplist',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_shop_list'),
+        ),
+        migrations.AddConstraint(
+            model_name='subscribe',
+            constraint=models.UniqueConstraint(fields=('subscriber', 'subscribed_to'), name='unique_subscription'),
+        ),
+        migrations.AddConstraint(
+            model_name='subscribe',
+            constraint=models.CheckConstraint(check=models.Q(('subscriber', django.db.models.expressions.F('subscribed_to')), _negated=True), name='no_self_subscription'),
+        ),
+    ]
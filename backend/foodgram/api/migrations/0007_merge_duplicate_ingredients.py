@@ -0,0 +1,46 @@
+# Generated by Django 3.2.3 on 2026-10-18 06:25
+
+from django.db import migrations
+from django.db.models import Count
+
+
+def merge_duplicates(apps, schema_editor):
+    Unit = apps.get_model('api', 'Unit')
+    Ingredient = apps.get_model('api', 'Ingredient')
+    RecipeIngredients = apps.get_model('api', 'RecipeIngredients')
+
+    titles = Unit.objects.values('title').annotate(
+        total=Count('id')
+    ).filter(total__gt=1)
+    for row in titles:
+        keep, *others = Unit.objects.filter(
+            title=row['title']
+        ).order_by('id').values_list('id', flat=True)
+        Ingredient.objects.filter(measurement_unit_id__in=others).update(
+            measurement_unit_id=keep
+        )
+        Unit.objects.filter(id__in=others).delete()
+
+    ingredients = Ingredient.objects.values(
+        'name', 'measurement_unit'
+    ).annotate(total=Count('id')).filter(total__gt=1)
+    for row in ingredients:
+        keep, *others = Ingredient.objects.filter(
+            name=row['name'],
+            measurement_unit=row['measurement_unit']
+        ).order_by('id').values_list('id', flat=True)
+        RecipeIngredients.objects.filter(ingredient_id__in=others).update(
+            ingredient_id=keep
+        )
+        Ingredient.objects.filter(id__in=others).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_job'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 3.2.3 on 2026-10-18 06:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_merge_duplicate_ingredients'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='unit',
+            name='title',
+            field=models.CharField(max_length=30, unique=True, verbose_name='Название'),
+        ),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('name', 'measurement_unit'), name='unique_ingredient_unit'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 3.2.3 on 2026-10-18 07:11
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def enqueue_variants(apps, schema_editor):
+    # Готовность вариантов раньше не хранилась: нарезаем их заново,
+    # до тех пор рецепты отдают оригинальные картинки.
+    Job = apps.get_model('api', 'Job')
+    Recipe = apps.get_model('api', 'Recipe')
+    Job.objects.bulk_create(
+        (
+            Job(
+                name='generate_recipe_variants',
+                payload={'recipe_id': recipe_id},
+                max_attempts=settings.JOB_MAX_ATTEMPTS
+            )
+            for recipe_id in Recipe.objects.exclude(image='').values_list(
+                'id', flat=True
+            ).iterator()
+        ),
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_feed_timeline'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='variants_image',
+            field=models.CharField(blank=True, editable=False, max_length=100, verbose_name='Картинка с готовыми вариантами'),
+        ),
+        migrations.RunPython(enqueue_variants, migrations.RunPython.noop),
+    ]
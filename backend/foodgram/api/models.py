@@ -1,8 +1,40 @@
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+    SearchVectorField,
+)
+from django.core.exceptions import EmptyResultSet
 from django.db import models
+from django.db.models import Exists, F, OuterRef, Prefetch, Window
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import RowNumber, Upper
+from django.utils import timezone
 
 from .validators import username_validator
 
+SEARCH_CONFIG = 'russian'
+
+
+class CustomUserQuerySet(models.QuerySet):
+    def with_is_subscribed(self, user):
+        if not user.is_authenticated:
+            return self
+        return self.annotate(
+            is_subscribed=Exists(
+                Subscribe.objects.filter(
+                    subscriber=user,
+                    subscribed_to=OuterRef('pk')
+                )
+            )
+        )
+
+
+class CustomUserManager(UserManager.from_queryset(CustomUserQuerySet)):
+    pass
+
 
 class CustomUser(AbstractUser):
     USERNAME_FIELD = 'email'
@@ -48,6 +80,18 @@ class CustomUser(AbstractUser):
         null=True,
         blank=True,
     )
+    recipes_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Рецептов'
+    )
+    subscribers_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Подписчиков'
+    )
+
+    objects = CustomUserManager()
 
     class Meta:
         verbose_name = 'Пользователь'
@@ -59,7 +103,11 @@ class CustomUser(AbstractUser):
 
 
 class Unit(models.Model):
-    title = models.CharField(max_length=30, verbose_name='Название')
+    title = models.CharField(
+        max_length=30,
+        unique=True,
+        verbose_name='Название'
+    )
 
     class Meta:
         verbose_name = 'Единица измерения'
@@ -83,6 +131,18 @@ class Ingredient(models.Model):
         verbose_name = 'Ингредиент'
         verbose_name_plural = 'Ингредиенты'
         ordering = ('name',)
+        indexes = (
+            models.Index(
+                OpClass(Upper('name'), name='text_pattern_ops'),
+                name='ingredient_name_prefix_idx'
+            ),
+        )
+        constraints = (
+            models.UniqueConstraint(
+                fields=('name', 'measurement_unit'),
+                name='unique_ingredient_unit'
+            ),
+        )
 
     def __str__(self):
         return self.name
@@ -125,6 +185,71 @@ class RecipeIngredients(models.Model):
         return f'{self.recipe} / {self.ingredient}'
 
 
+class RecipeQuerySet(models.QuerySet):
+    def with_user_flags(self, user):
+        if not user.is_authenticated:
+            return self
+        return self.annotate(
+            is_favorited=Exists(
+                Favorite.objects.filter(recipe=OuterRef('pk'), user=user)
+            ),
+            is_in_shopping_cart=Exists(
+                ShopList.objects.filter(recipe=OuterRef('pk'), user=user)
+            ),
+        )
+
+    def with_related(self, user):
+        queryset = self.prefetch_related(
+            'tags',
+            Prefetch(
+                'recipes',
+                queryset=RecipeIngredients.objects.select_related(
+                    'ingredient__measurement_unit'
+                )
+            )
+        )
+        if not user.is_authenticated:
+            return queryset.select_related('author')
+        return queryset.prefetch_related(
+            Prefetch(
+                'author',
+                queryset=CustomUser.objects.with_is_subscribed(user)
+            )
+        )
+
+    def limit_per_author(self, limit):
+        ranked = self.annotate(
+            recipe_rank=Window(
+                expression=RowNumber(),
+                partition_by=F('author'),
+                order_by=(F('created').desc(), F('id').desc())
+            )
+        ).values('id', 'recipe_rank')
+        try:
+            sql, params = ranked.query.sql_with_params()
+        except EmptyResultSet:
+            # Например, author__in=[] для пустой страницы подписок.
+            return self.none()
+        return self.model.objects.filter(id__in=RawSQL(
+            f'SELECT id FROM ({sql}) AS ranked WHERE recipe_rank <= %s',
+            (*params, limit)
+        ))
+
+    def update_search_vector(self):
+        return self.update(search_vector=(
+            SearchVector('name', weight='A', config=SEARCH_CONFIG)
+            + SearchVector('text', weight='B', config=SEARCH_CONFIG)
+        ))
+
+    def search(self, text):
+        query = SearchQuery(
+            text, config=SEARCH_CONFIG, search_type='websearch'
+        )
+        return self.filter(search_vector=query).annotate(
+            search_rank=SearchRank(F('search_vector'), query)
+        ).order_by('-search_rank', '-created', '-id')
+
+
 class Recipe(models.Model):
     author = models.ForeignKey(
         CustomUser,
@@ -133,6 +258,12 @@ class Recipe(models.Model):
     )
     name = models.CharField(max_length=256, verbose_name='Название')
     image = models.ImageField(upload_to='recipes/', verbose_name='Картинка')
+    variants_image = models.CharField(
+        max_length=100,
+        blank=True,
+        editable=False,
+        verbose_name='Картинка с готовыми вариантами'
+    )
     text = models.TextField(max_length=2000, verbose_name='Описание')
     ingredients = models.ManyToManyField(
         Ingredient,
@@ -144,11 +275,30 @@ class Recipe(models.Model):
         verbose_name='Время приготовления'
     )
     created = models.DateTimeField(auto_now_add=True, verbose_name='Создано в')
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Добавлен в избранное (раз)'
+    )
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
-        ordering = ('-created',)
+        ordering = ('-created', '-id')
+        indexes = (
+            models.Index(
+                fields=('-created', '-id'),
+                name='recipe_created_id_idx'
+            ),
+            models.Index(
+                fields=('author', '-created', '-id'),
+                name='recipe_author_created_idx'
+            ),
+            GinIndex(fields=('search_vector',), name='recipe_search_idx'),
+        )
 
     def __str__(self):
         return self.name
@@ -172,6 +322,16 @@ class Subscribe(models.Model):
         verbose_name = 'Подписка'
         verbose_name_plural = 'Подписки'
         ordering = ('subscriber', 'subscribed_to')
+        constraints = (
+            models.UniqueConstraint(
+                fields=('subscriber', 'subscribed_to'),
+                name='unique_subscription'
+            ),
+            models.CheckConstraint(
+                check=~models.Q(subscriber=F('subscribed_to')),
+                name='no_self_subscription'
+            ),
+        )
 
     def __str__(self):
         return f'Подписка пользователя {self.subscriber}'
@@ -195,6 +355,12 @@ class Favorite(models.Model):
         verbose_name = 'Избранное'
         verbose_name_plural = 'Избранные'
         ordering = ('user', 'recipe')
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'recipe'),
+                name='unique_favorite'
+            ),
+        )
 
     def __str__(self):
         return f'Избранное пользователя {self.user}'
@@ -219,6 +385,110 @@ class ShopList(models.Model):
         verbose_name = 'Список покупок'
         verbose_name_plural = 'Списки покупок'
         ordering = ('user', 'recipe')
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'recipe'),
+                name='unique_shop_list'
+            ),
+        )
 
     def __str__(self):
         return f'Список покупок пользователя {self.user}'
+
+
+class TimelineEntry(models.Model):
+    """Рецепт в ленте подписчика, разложенный при публикации."""
+
+    user = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Подписчик'
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Рецепт'
+    )
+    author = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор'
+    )
+    created = models.DateTimeField(verbose_name='Создано в')
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        ordering = ('user', '-created', '-recipe')
+        indexes = (
+            models.Index(
+                fields=('user', '-created', '-recipe'),
+                name='timeline_user_created_idx'
+            ),
+            models.Index(
+                fields=('user', 'author'),
+                name='timeline_user_author_idx'
+            ),
+        )
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'recipe'),
+                name='unique_timeline_entry'
+            ),
+        )
+
+    def __str__(self):
+        return f'Лента пользователя {self.user}'
+
+
+class Job(models.Model):
+    PENDING = 'pending'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (FAILED, 'Ошибка'),
+    )
+
+    name = models.CharField(max_length=100, verbose_name='Задача')
+    payload = models.JSONField(default=dict, verbose_name='Параметры')
+    priority = models.SmallIntegerField(default=0, verbose_name='Приоритет')
+    status = models.CharField(
+        max_length=10,
+        choices=STATUSES,
+        default=PENDING,
+        verbose_name='Статус'
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Попыток'
+    )
+    max_attempts = models.PositiveSmallIntegerField(
+        default=5,
+        verbose_name='Максимум попыток'
+    )
+    run_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Запустить после'
+    )
+    last_error = models.TextField(blank=True, verbose_name='Последняя ошибка')
+    created = models.DateTimeField(auto_now_add=True, verbose_name='Создано в')
+
+    class Meta:
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+        ordering = ('-priority', 'run_at')
+        indexes = (
+            models.Index(
+                fields=('-priority', 'run_at'),
+                condition=models.Q(status__in=('pending', 'running')),
+                name='job_queue_idx'
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.name} #{self.id}'
@@ -0,0 +1,115 @@
+import binascii
+from base64 import b64decode, b64encode
+
+from django.conf import settings
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (
+    BasePagination,
+    CursorPagination,
+    PageNumberPagination,
+)
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class RecipeCursorPagination(CursorPagination):
+    ordering = ('-created', '-id')
+    page_size_query_param = 'limit'
+
+
+class RecipePagination(PageNumberPagination):
+    """Постраничная выдача, а с параметром ?cursor= — курсорная.
+
+    Курсор держит порядок (-created, -id). Результаты ?search=
+    упорядочены по релевантности, поэтому для них курсор игнорируется
+    и выдача всегда постраничная.
+    """
+
+    page_size_query_param = 'limit'
+    cursor_pagination_class = RecipeCursorPagination
+    ranked_query_param = 'search'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        cursor_paginator = self.cursor_pagination_class()
+        if (
+            cursor_paginator.cursor_query_param in request.query_params
+            and not request.query_params.get(self.ranked_query_param)
+        ):
+            self.cursor_paginator = cursor_paginator
+            return cursor_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class FeedPagination(BasePagination):
+    """Keyset-пагинация ленты: курсор хранит (created, id) последнего
+    рецепта страницы, поэтому глубина листания не влияет на скорость."""
+
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'limit'
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return api_settings.PAGE_SIZE
+        if size < 1:
+            return api_settings.PAGE_SIZE
+        return min(size, settings.FEED_MAX_PAGE_SIZE)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            created, pk = b64decode(
+                encoded.encode('ascii'), altchars=b'-_', validate=True
+            ).decode('ascii').split(' ')
+            position = (parse_datetime(created), int(pk))
+        except (ValueError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        if position[0] is None:
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def encode_cursor(self, position):
+        created, pk = position
+        encoded = b64encode(
+            f'{created.isoformat()} {pk}'.encode('ascii'), altchars=b'-_'
+        ).decode('ascii')
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            encoded
+        )
+
+    def paginate_feed(self, get_page, request):
+        """Идентификаторы рецептов страницы.
+
+        get_page(position, size) возвращает до size + 1 позиций
+        (created, id) после position.
+        """
+        self.request = request
+        size = self.get_page_size(request)
+        page = get_page(self.decode_cursor(request), size)
+        self.next_position = page[size - 1] if len(page) > size else None
+        return [recipe_id for _, recipe_id in page[:size]]
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': (
+                None if self.next_position is None
+                else self.encode_cursor(self.next_position)
+            ),
+            'results': data,
+        })
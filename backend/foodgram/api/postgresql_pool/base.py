@@ -0,0 +1,141 @@
+"""Бэкенд PostgreSQL с пулом соединений внутри процесса.
+
+Закрытие соединения возвращает его в пул, поэтому с CONN_MAX_AGE = 0
+каждый запрос берёт готовое соединение и отдаёт его по завершении.
+Пул ограничивает число соединений процесса: лишние потоки ждут
+освобождения до POOL_TIMEOUT секунд.
+"""
+import os
+import threading
+
+from django.conf import settings
+from django.db.backends.postgresql import base, creation
+from psycopg2 import extras, pool
+
+POOL_OPTIONS = ('POOL_MIN_SIZE', 'POOL_MAX_SIZE', 'POOL_TIMEOUT')
+
+_pools = {}
+_inherited = []
+_lock = threading.Lock()
+
+
+class BlockingConnectionPool(pool.ThreadedConnectionPool):
+    def __init__(self, minconn, maxconn, timeout, *args, **kwargs):
+        self.timeout = timeout
+        self.slots = threading.BoundedSemaphore(maxconn)
+        super().__init__(minconn, maxconn, *args, **kwargs)
+
+    def getconn(self, key=None):
+        if not self.slots.acquire(timeout=self.timeout):
+            raise pool.PoolError(
+                'Нет свободных соединений в пуле за {} с'.format(self.timeout)
+            )
+        try:
+            return super().getconn(key)
+        except Exception:
+            self.slots.release()
+            raise
+
+    def putconn(self, conn, key=None, close=False):
+        try:
+            super().putconn(conn, key, close)
+        finally:
+            self.slots.release()
+
+    def _putconn(self, conn, key=None, close=False):
+        # psycopg2 закрывает возвращённое соединение, если свободных уже
+        # minconn: при нагрузке выше POOL_MIN_SIZE каждое получение
+        # открывало бы новое. Свободные соединения держим до maxconn,
+        # а minconn задаёт только число открытых при создании пула.
+        # Вызывается под блокировкой пула.
+        minconn, self.minconn = self.minconn, self.maxconn
+        try:
+            super()._putconn(conn, key, close)
+        finally:
+            self.minconn = minconn
+
+
+def forget_pools():
+    # Соединения родителя нельзя закрывать в дочернем процессе:
+    # psycopg2 отправит серверу Terminate от имени родителя.
+    _inherited.extend(_pools.values())
+    _pools.clear()
+
+
+os.register_at_fork(after_in_child=forget_pools)
+
+
+def close_pools(database):
+    with _lock:
+        for key in [key for key in _pools if key[0] == database]:
+            _pools.pop(key).closeall()
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    def _destroy_test_db(self, test_database_name, verbosity):
+        close_pools(test_database_name)
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+
+    def get_connection_params(self):
+        conn_params = super().get_connection_params()
+        for option in POOL_OPTIONS:
+            conn_params.pop(option, None)
+        return conn_params
+
+    def get_pool(self, conn_params):
+        key = (conn_params['database'], tuple(sorted(conn_params.items())))
+        with _lock:
+            if key not in _pools:
+                options = self.settings_dict['OPTIONS']
+                _pools[key] = BlockingConnectionPool(
+                    options.get('POOL_MIN_SIZE', 1),
+                    options.get('POOL_MAX_SIZE', 10),
+                    options.get('POOL_TIMEOUT', 30),
+                    **conn_params
+                )
+            return _pools[key]
+
+    def get_new_connection(self, conn_params):
+        connection_pool = self.get_pool(conn_params)
+        while True:
+            connection = connection_pool.getconn()
+            if connection.closed or (
+                settings.CONN_HEALTH_CHECKS
+                and not self.is_connection_usable(connection)
+            ):
+                connection_pool.putconn(connection, close=True)
+                continue
+            break
+        self.connection_pool = connection_pool
+        options = self.settings_dict['OPTIONS']
+        if 'isolation_level' in options:
+            self.isolation_level = options['isolation_level']
+            if self.isolation_level != connection.isolation_level:
+                connection.set_session(isolation_level=self.isolation_level)
+        else:
+            self.isolation_level = connection.isolation_level
+        extras.register_default_jsonb(
+            conn_or_curs=connection, loads=lambda x: x
+        )
+        return connection
+
+    @staticmethod
+    def is_connection_usable(connection):
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            if not connection.autocommit:
+                connection.rollback()
+        except base.Database.Error:
+            return False
+        return True
+
+    def _close(self):
+        if self.connection is None:
+            return
+        with self.wrap_database_errors:
+            self.connection_pool.putconn(self.connection)
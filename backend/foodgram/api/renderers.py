@@ -0,0 +1,63 @@
+"""JSON-рендерер и парсер DRF на orjson.
+
+Вывод побайтно совпадает со стандартным JSONRenderer при настройках
+по умолчанию (UNICODE_JSON, COMPACT_JSON, STRICT_JSON). Всё, чего
+orjson не умеет так же, отдаётся стандартной реализации: отступы,
+целые длиннее 64 бит, кодировки кроме UTF-8. Отличаются только
+числа с плавающей точкой: порядок orjson пишет как 1e16, а не 1e+16,
+NaN и бесконечность - как null, тогда как JSONRenderer на них падает.
+В ответах API таких чисел нет.
+"""
+import orjson
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+
+OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+LINE_SEPARATORS = (
+    ('\u2028'.encode(), b'\\u2028'),
+    ('\u2029'.encode(), b'\\u2029'),
+)
+
+
+def is_compatible():
+    return (
+        api_settings.UNICODE_JSON
+        and api_settings.COMPACT_JSON
+        and api_settings.STRICT_JSON
+    )
+
+
+class ORJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        renderer_context = renderer_context or {}
+        if (
+            not is_compatible()
+            or self.get_indent(accepted_media_type, renderer_context)
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(
+                data, default=self.encoder_class().default, option=OPTIONS
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Как и JSONRenderer, экранируем разделители строк для JavaScript.
+        for raw, escaped in LINE_SEPARATORS:
+            if raw in ret:
+                ret = ret.replace(raw, escaped)
+        return ret
+
+
+class ORJSONParser(JSONParser):
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', 'utf-8')
+        if encoding.lower().replace('_', '-') not in ('utf-8', 'utf8'):
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
@@ -1,11 +1,14 @@
-import base64
+from functools import partial
 
 from django.contrib.auth import get_user_model
-from django.core.files.base import ContentFile
+from django.db import IntegrityError, transaction
 from django.shortcuts import get_object_or_404
-from django_short_url.views import get_surl
+from django.urls import reverse
 from rest_framework import serializers
+from rest_framework.settings import api_settings
 
+from .caching import bump_recipe_versions
+from .images import decode_base64_file, get_variant_url
 from .models import (
     Favorite,
     Ingredient,
@@ -15,22 +18,56 @@ from .models import (
     Tag,
     ShopList
 )
+from .short_links import encode_id
 
 User = get_user_model()
 MIN_VALUE = 1
 MAX_VALUE = 32000
 
 
+def create_unique(model, message, **fields):
+    try:
+        with transaction.atomic():
+            return model.objects.create(**fields)
+    except IntegrityError:
+        raise serializers.ValidationError(
+            {api_settings.NON_FIELD_ERRORS_KEY: [message]}
+        )
+
+
 class Base64ImageField(serializers.ImageField):
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith('data:image'):
             format, imgstr = data.split(';base64,')
             ext = format.split('/')[-1]
-            data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
+            try:
+                data = decode_base64_file(
+                    imgstr,
+                    name='temp.' + ext,
+                    content_type=format.split(':')[-1]
+                )
+            except ValueError:
+                self.fail('invalid_image')
 
         return super().to_internal_value(data)
 
 
+class RecipeImageField(serializers.ImageField):
+    def __init__(self, variant='full', **kwargs):
+        self.variant = variant
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        variant = self.context.get('image_variant', self.variant)
+        url = get_variant_url(value, variant)
+        request = self.context.get('request')
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
+
+
 class TagSerializer(serializers.ModelSerializer):
     class Meta:
         model = Tag
@@ -51,6 +88,8 @@ class IngredientSerializer(serializers.ModelSerializer):
 
 
 class RecipeMiniSerializer(serializers.ModelSerializer):
+    image = RecipeImageField(variant='thumbnail', read_only=True)
+
     class Meta:
         model = Recipe
         fields = ('id', 'name', 'image', 'cooking_time')
@@ -70,15 +109,17 @@ class SubscribeCreateSerializer(serializers.ModelSerializer):
         if subscriber == subscribed_to:
             raise serializers.ValidationError('Нельзя подписаться на себя!')
 
-        if subscriber.subscriber.filter(subscribed_to=subscribed_to).exists():
-            raise serializers.ValidationError(
-                'Вы уже подписаны на этого пользователя!'
-            )
-
         data['subscriber'] = subscriber
         data['subscribed_to'] = subscribed_to
         return data
 
+    def create(self, validated_data):
+        return create_unique(
+            Subscribe,
+            'Вы уже подписаны на этого пользователя!',
+            **validated_data
+        )
+
     def to_representation(self, instance):
         user = instance.subscribed_to
         return SubscribeListSerializer(user, context=self.context).data
@@ -119,12 +160,14 @@ class UserSerializer(serializers.ModelSerializer):
         request = self.context.get('request')
         if request is None or request.user.is_anonymous or request.user == obj:
             return False
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         return obj.subscribed_to.filter(subscriber=request.user).exists()
 
 
 class SubscribeListSerializer(UserSerializer):
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
+    recipes_count = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = User
@@ -132,20 +175,14 @@ class SubscribeListSerializer(UserSerializer):
 
     def get_recipes(self, obj):
         recipes = obj.recipes.all()
-        limit = self.context['request'].GET.get('recipes_limit')
-        if limit:
+        limit = self.context['request'].GET.get('recipes_limit', '')
+        if limit.isdigit():
             recipes = recipes[:int(limit)]
         return RecipeMiniSerializer(recipes, many=True, read_only=True).data
 
-    def get_recipes_count(self, obj):
-        return obj.recipes.count()
-
 
 class IngredientAmountSerializer(serializers.ModelSerializer):
-    id = serializers.PrimaryKeyRelatedField(
-        queryset=Ingredient.objects.all(),
-        source='ingredient'
-    )
+    id = serializers.IntegerField(source='ingredient_id')
     amount = serializers.IntegerField(
         required=True,
         min_value=MIN_VALUE,
@@ -174,6 +211,7 @@ class RecipeSerializer(serializers.ModelSerializer):
     ingredients = IngredientRecipeSerializer(many=True, source='recipes')
     tags = TagSerializer(read_only=True, many=True)
     author = UserSerializer(read_only=True)
+    image = RecipeImageField(read_only=True)
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
 
@@ -196,13 +234,17 @@ class RecipeSerializer(serializers.ModelSerializer):
         request = self.context.get('request')
         if request is None or not request.user.is_authenticated:
             return False
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         return obj.shop_recipe.filter(user=request.user).exists()
 
     def get_is_favorited(self, obj):
         request = self.context.get('request')
         if request is None or not request.user.is_authenticated:
             return False
-        return obj.favorited_by.filter(recipe=obj, user=request.user).exists()
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
+        return obj.favorited_by.filter(user=request.user).exists()
 
 
 class RecipeCreateSerializer(RecipeSerializer):
@@ -214,8 +256,7 @@ class RecipeCreateSerializer(RecipeSerializer):
         max_value=MAX_VALUE
     )
     author = UserSerializer(read_only=True)
-    tags = serializers.PrimaryKeyRelatedField(queryset=Tag.objects.all(),
-                                              many=True)
+    tags = serializers.ListField(child=serializers.IntegerField())
 
     class Meta:
         model = Recipe
@@ -236,12 +277,12 @@ class RecipeCreateSerializer(RecipeSerializer):
         recipe_ingredients = []
 
         for ingredient_data in ingredients_data:
-            ingredient = ingredient_data['ingredient']
+            ingredient_id = ingredient_data['ingredient_id']
             amount = ingredient_data['amount']
 
             recipe_ingredients.append(
                 RecipeIngredients(
-                    ingredient_id=ingredient.id,
+                    ingredient_id=ingredient_id,
                     recipe_id=recipe_id,
                     amount=amount
                 )
@@ -249,37 +290,83 @@ class RecipeCreateSerializer(RecipeSerializer):
         RecipeIngredients.objects.bulk_create(recipe_ingredients)
         return recipe_ingredients
 
-    def validate(self, data):
-        request = self.context['request']
-        tags_data = request.data.get('tags')
-        ingredients_data = request.data.get('ingredients')
+    @staticmethod
+    def get_missing_ids(model, ids):
+        existing = model.objects.filter(id__in=ids).values_list(
+            'id', flat=True
+        )
+        return ', '.join(map(str, sorted(set(ids) - set(existing))))
+
+    def get_tags_error(self, tags_data):
         if not tags_data:
-            raise serializers.ValidationError(
-                {'tags': 'Неверно переданы теги!'}
-            )
+            return 'Неверно переданы теги!'
         if len(set(tags_data)) < len(tags_data):
-            raise serializers.ValidationError(
-                {'tags': 'Переданы одинаковые теги!'}
-            )
-        for tag in tags_data:
-            if not Tag.objects.filter(id=tag).exists():
-                raise serializers.ValidationError(
-                    {'tags': 'Несуществующий тег.'}
-                )
+            return 'Переданы одинаковые теги!'
+        missing_tags = self.get_missing_ids(Tag, tags_data)
+        if missing_tags:
+            return f'Несуществующие теги: {missing_tags}.'
+        return None
+
+    def get_ingredients_error(self, ingredients_data):
         if not ingredients_data:
-            raise serializers.ValidationError(
-                {'ingredients': 'Неверно переданы ингредиенты!'}
-            )
-        unique_ingredients = set()
-        for ingredient in ingredients_data:
-            unique_ingredients.add(ingredient['id'])
+            return 'Неверно переданы ингредиенты!'
+        ingredient_ids = [
+            ingredient['ingredient_id'] for ingredient in ingredients_data
+        ]
+        if len(set(ingredient_ids)) < len(ingredient_ids):
+            return 'Переданы одинаковые ингредиенты!'
+        missing_ingredients = self.get_missing_ids(Ingredient, ingredient_ids)
+        if missing_ingredients:
+            return f'Несуществующие ингредиенты: {missing_ingredients}.'
+        return None
 
-        if len(unique_ingredients) < len(ingredients_data):
-            raise serializers.ValidationError(
-                {'ingredients': 'Переданы одинаковые ингредиенты!'}
-            )
+    def validate(self, data):
+        errors = {
+            'tags': self.get_tags_error(data.get('tags')),
+            'ingredients': self.get_ingredients_error(
+                data.get('ingredients')
+            ),
+        }
+        errors = {field: error for field, error in errors.items() if error}
+        if errors:
+            raise serializers.ValidationError(errors)
         return data
 
+    @staticmethod
+    def update_ingredients(recipe, ingredients_data):
+        amounts = {
+            ingredient_data['ingredient_id']: ingredient_data['amount']
+            for ingredient_data in ingredients_data
+        }
+        to_delete = []
+        to_update = []
+        existing = set()
+        for recipe_ingredient in recipe.recipes.all():
+            ingredient_id = recipe_ingredient.ingredient_id
+            if ingredient_id not in amounts or ingredient_id in existing:
+                to_delete.append(recipe_ingredient.id)
+            elif recipe_ingredient.amount != amounts[ingredient_id]:
+                recipe_ingredient.amount = amounts[ingredient_id]
+                to_update.append(recipe_ingredient)
+            existing.add(ingredient_id)
+        to_create = [
+            RecipeIngredients(
+                recipe_id=recipe.id,
+                ingredient_id=ingredient_id,
+                amount=amount
+            )
+            for ingredient_id, amount in amounts.items()
+            if ingredient_id not in existing
+        ]
+        if to_delete:
+            RecipeIngredients.objects.filter(id__in=to_delete).delete()
+        if to_update:
+            RecipeIngredients.objects.bulk_update(to_update, ('amount',))
+        if to_create:
+            RecipeIngredients.objects.bulk_create(to_create)
+        return bool(to_delete or to_update or to_create)
+
+    @transaction.atomic
     def create(self, validated_data):
         ingredients_data = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
@@ -292,17 +379,23 @@ class RecipeCreateSerializer(RecipeSerializer):
         )
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         ingredients_data = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
 
-        instance.ingredients.clear()
+        changed_fields = [
+            field for field, value in validated_data.items()
+            if getattr(instance, field) != value
+        ]
+        for field in changed_fields:
+            setattr(instance, field, validated_data[field])
+        if changed_fields:
+            instance.save(update_fields=changed_fields)
         instance.tags.set(tags)
-        self.create_ingredients(
-            ingredients_data,
-            instance.id
-        )
-        return super().update(instance, validated_data)
+        if self.update_ingredients(instance, ingredients_data):
+            transaction.on_commit(partial(bump_recipe_versions, instance.id))
+        return instance
 
     def to_representation(self, instance):
         return RecipeSerializer(
@@ -312,68 +405,57 @@ class RecipeCreateSerializer(RecipeSerializer):
 
 
 class FavoriteSerializer(serializers.ModelSerializer):
-    recipe = RecipeSerializer(read_only=True)
+    recipe = RecipeMiniSerializer(read_only=True)
 
     class Meta:
         model = Favorite
         fields = ('recipe',)
 
-    def validate(self, data):
-        user = self.context['request'].user
-        recipe_id = self.context['view'].kwargs.get('id')
-
-        if user.favorites.filter(recipe__id=recipe_id).exists():
-            raise serializers.ValidationError(
-                'Этот рецепт уже добавлен в избранное.'
-            )
-
-        return data
-
     def create(self, validated_data):
         user = self.context['request'].user
         recipe_id = self.context['view'].kwargs.get('id')
         recipe = get_object_or_404(Recipe, id=recipe_id)
-        return Favorite.objects.create(user=user, recipe=recipe)
+        return create_unique(
+            Favorite,
+            'Этот рецепт уже добавлен в избранное.',
+            user=user,
+            recipe=recipe
+        )
 
     def to_representation(self, instance):
         recipe = instance.recipe
         return {
             'id': recipe.id,
             'name': recipe.name,
-            'image': recipe.image.url,
+            'image': get_variant_url(recipe.image, 'thumbnail'),
             'cooking_time': recipe.cooking_time
         }
 
 
 class ShopListSerializer(serializers.ModelSerializer):
-    recipe = RecipeSerializer(read_only=True)
+    recipe = RecipeMiniSerializer(read_only=True)
 
     class Meta:
         model = ShopList
         fields = ('recipe',)
 
-    def validate(self, data):
-        user = self.context['request'].user
-        recipe_id = self.context['view'].kwargs.get('id')
-
-        if user.shop_user.filter(recipe__id=recipe_id).exists():
-            raise serializers.ValidationError(
-                'Этот рецепт уже добавлен в список покупок.'
-            )
-        return data
-
     def create(self, validated_data):
         user = self.context['request'].user
         recipe_id = self.context['view'].kwargs.get('id')
         recipe = get_object_or_404(Recipe, id=recipe_id)
-        return ShopList.objects.create(user=user, recipe=recipe)
+        return create_unique(
+            ShopList,
+            'Этот рецепт уже добавлен в список покупок.',
+            user=user,
+            recipe=recipe
+        )
 
     def to_representation(self, instance):
         recipe = instance.recipe
         return {
             'id': recipe.id,
             'name': recipe.name,
-            'image': recipe.image.url,
+            'image': get_variant_url(recipe.image, 'thumbnail'),
             'cooking_time': recipe.cooking_time
         }
 
@@ -387,10 +469,10 @@ class ShortURLSerializer(serializers.ModelSerializer):
 
     def get_short_url(self, obj):
         request = self.context.get('request')
-        if request and request.resolver_match:
-            recipe_id = request.resolver_match.kwargs.get('id')
-            surl = get_surl(f"/api/recipes/{recipe_id}/")
-            return f'{request.scheme}://{request.get_host()}{surl}'
+        if request:
+            return request.build_absolute_uri(
+                reverse('short_link', args=(encode_id(obj.id),))
+            )
 
     def to_representation(self, instance):
         representation = super().to_representation(instance)
@@ -0,0 +1,121 @@
+import csv
+import io
+import os
+
+from django.conf import settings
+from django.db.models import Sum
+from django.http import StreamingHttpResponse
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+from rest_framework.negotiation import DefaultContentNegotiation
+
+from .models import RecipeIngredients
+
+TITLE = 'Ваш список покупок'
+CSV_HEADER = ('Ингредиент', 'Единица измерения', 'Количество')
+PDF_FONT = 'ShoppingListFont'
+PDF_FONT_SIZE = 12
+PDF_LINE_HEIGHT = 18
+PDF_MARGIN = 50
+CHUNK_SIZE = 8192
+
+
+class ShoppingListNegotiation(DefaultContentNegotiation):
+    """Параметр ?format= выбирает формат файла, а не рендерер DRF."""
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        renderer = renderers[0]
+        return renderer, renderer.media_type
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+def get_shopping_list(user):
+    return (
+        RecipeIngredients.objects
+        .filter(recipe__shop_recipe__user=user)
+        .values('ingredient__name', 'ingredient__measurement_unit__title')
+        .annotate(total_amount=Sum('amount'))
+        .order_by('ingredient__name', 'ingredient__measurement_unit__title')
+    )
+
+
+def render_txt(items):
+    yield f'{TITLE}:\n\n'
+    for item in items:
+        yield '{} ({}): {}\n'.format(
+            item['ingredient__name'],
+            item['ingredient__measurement_unit__title'],
+            item['total_amount']
+        )
+
+
+def render_csv(items):
+    writer = csv.writer(Echo())
+    yield '\ufeff' + writer.writerow(CSV_HEADER)
+    for item in items:
+        yield writer.writerow((
+            item['ingredient__name'],
+            item['ingredient__measurement_unit__title'],
+            item['total_amount']
+        ))
+
+
+def get_pdf_font():
+    if PDF_FONT in pdfmetrics.getRegisteredFontNames():
+        return PDF_FONT
+    if os.path.exists(settings.SHOPPING_LIST_FONT):
+        pdfmetrics.registerFont(TTFont(PDF_FONT, settings.SHOPPING_LIST_FONT))
+        return PDF_FONT
+    return 'Helvetica'
+
+
+def render_pdf(items):
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    font = get_pdf_font()
+    _, height = A4
+    y = height - PDF_MARGIN
+    pdf.setFont(font, PDF_FONT_SIZE)
+    pdf.drawString(PDF_MARGIN, y, TITLE)
+    y -= PDF_LINE_HEIGHT * 2
+    for item in items:
+        if y < PDF_MARGIN:
+            pdf.showPage()
+            pdf.setFont(font, PDF_FONT_SIZE)
+            y = height - PDF_MARGIN
+        pdf.drawString(PDF_MARGIN, y, '{} ({}): {}'.format(
+            item['ingredient__name'],
+            item['ingredient__measurement_unit__title'],
+            item['total_amount']
+        ))
+        y -= PDF_LINE_HEIGHT
+    pdf.save()
+    buffer.seek(0)
+    yield from iter(lambda: buffer.read(CHUNK_SIZE), b'')
+
+
+SHOPPING_LIST_FORMATS = {
+    'txt': (render_txt, 'text/plain; charset=utf-8'),
+    'csv': (render_csv, 'text/csv; charset=utf-8'),
+    'pdf': (render_pdf, 'application/pdf'),
+}
+
+
+def shopping_list_response(user, file_format):
+    render, content_type = SHOPPING_LIST_FORMATS[file_format]
+    # Строки читаются здесь, а не при отдаче тела: под ASGI Django
+    # перебирает StreamingHttpResponse в цикле событий, где ORM запрещён.
+    # Список сгруппирован по ингредиентам и поэтому невелик.
+    response = StreamingHttpResponse(
+        render(list(get_shopping_list(user))),
+        content_type=content_type
+    )
+    file_name = f'{user.username}_shopping_list.{file_format}'
+    response['Content-Disposition'] = f'attachment; filename={file_name}'
+    return response
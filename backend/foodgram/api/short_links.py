@@ -0,0 +1,72 @@
+import hashlib
+import math
+import string
+
+from django.conf import settings
+from django.http import Http404, HttpResponsePermanentRedirect
+from django.utils.cache import patch_cache_control
+from django_short_url.views import short_url_redirect
+
+CODE_LENGTH = 6
+BASE = 62
+MODULUS = BASE ** CODE_LENGTH
+
+
+def get_salted_params(salt):
+    """Перемешанный алфавит и аффинное преобразование, заданные солью."""
+    digest = hashlib.sha256(salt.encode()).digest()
+    alphabet = ''.join(sorted(
+        string.digits + string.ascii_letters,
+        key=lambda char: hashlib.sha256((salt + char).encode()).digest()
+    ))
+    multiplier = int.from_bytes(digest[:8], 'big') % MODULUS | 1
+    while math.gcd(multiplier, MODULUS) != 1:
+        multiplier += 2
+    offset = int.from_bytes(digest[8:16], 'big') % MODULUS
+    return alphabet, multiplier, pow(multiplier, -1, MODULUS), offset
+
+
+ALPHABET, MULTIPLIER, INVERSE, OFFSET = get_salted_params(
+    settings.SHORT_LINK_SALT
+)
+
+
+def encode_id(recipe_id):
+    if not 0 < recipe_id < MODULUS:
+        raise ValueError(f'Идентификатор вне диапазона: {recipe_id}')
+    number = (recipe_id * MULTIPLIER + OFFSET) % MODULUS
+    chars = []
+    for _ in range(CODE_LENGTH):
+        number, digit = divmod(number, BASE)
+        chars.append(ALPHABET[digit])
+    return ''.join(reversed(chars))
+
+
+def decode_id(code):
+    if len(code) != CODE_LENGTH:
+        raise ValueError('Неверная длина кода')
+    number = 0
+    for char in code:
+        digit = ALPHABET.find(char)
+        if digit < 0:
+            raise ValueError('Недопустимый символ в коде')
+        number = number * BASE + digit
+    recipe_id = (number - OFFSET) * INVERSE % MODULUS
+    if recipe_id == 0:
+        raise ValueError('Неверный код')
+    return recipe_id
+
+
+def short_link_redirect(request, code):
+    try:
+        recipe_id = decode_id(code)
+    except ValueError:
+        if len(code) == CODE_LENGTH:
+            raise Http404
+        # Ссылки, выданные раньше через django_short_url.
+        return short_url_redirect(request, code)
+    response = HttpResponsePermanentRedirect(f'/recipes/{recipe_id}')
+    patch_cache_control(
+        response, public=True, max_age=settings.SHORT_LINK_CACHE_TIMEOUT
+    )
+    return response
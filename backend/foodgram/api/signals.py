@@ -0,0 +1,203 @@
+from functools import partial
+
+from django.core.signals import request_started
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_init,
+    post_save,
+    pre_delete,
+)
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import forget_tokens
+from .caching import bump_recipe_versions
+from .catalog import bump_catalog_version
+from .counters import (
+    change_counter,
+    deleting_finished,
+    deleting_started,
+    forget_deleting,
+    is_deleting,
+)
+from .db import check_connections
+from .feed import unsubscribed
+from .jobs import enqueue
+from .metrics import DB_CONNECTIONS_OPENED, install_query_tracking
+from .models import (
+    CustomUser,
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeIngredients,
+    Subscribe,
+    Tag,
+    Unit,
+)
+
+
+@receiver((post_save, post_delete), sender=Tag)
+@receiver((post_save, post_delete), sender=Ingredient)
+@receiver((post_save, post_delete), sender=Unit)
+def catalog_changed(sender, **kwargs):
+    bump_catalog_version()
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def recipe_changed(sender, instance, **kwargs):
+    transaction.on_commit(partial(bump_recipe_versions, instance.pk))
+
+
+def get_image_name(instance):
+    # Без обращения к дескриптору: отложенное поле не загружается.
+    value = instance.__dict__.get('image')
+    return getattr(value, 'name', value) or None
+
+
+@receiver(post_init, sender=Recipe)
+def recipe_loaded(sender, instance, **kwargs):
+    instance.saved_image = get_image_name(instance)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_image_saved(sender, instance, created, **kwargs):
+    if 'image' not in instance.__dict__:
+        return
+    image = get_image_name(instance)
+    # У нового рецепта saved_image - имя загруженного файла до
+    # сохранения, а не файл в хранилище.
+    saved_image = None if created else instance.saved_image
+    instance.saved_image = image
+    if image == saved_image:
+        return
+    if image:
+        enqueue('generate_recipe_variants', {'recipe_id': instance.pk})
+    if saved_image:
+        enqueue('delete_image', {'name': saved_image})
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_image_deleted(sender, instance, **kwargs):
+    image = get_image_name(instance)
+    if image:
+        enqueue('delete_image', {'name': image})
+
+
+@receiver((post_save, post_delete), sender=RecipeIngredients)
+def recipe_ingredients_changed(sender, instance, **kwargs):
+    transaction.on_commit(partial(bump_recipe_versions, instance.recipe_id))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        transaction.on_commit(partial(bump_recipe_versions, instance.pk))
+    elif pk_set is None:
+        transaction.on_commit(bump_catalog_version)
+    else:
+        transaction.on_commit(partial(bump_recipe_versions, *pk_set))
+
+
+@receiver(post_save, sender=CustomUser)
+def author_changed(sender, instance, created, update_fields=None, **kwargs):
+    if created or update_fields == frozenset(('last_login',)):
+        return
+    recipe_ids = list(instance.recipes.values_list('id', flat=True))
+    if recipe_ids:
+        transaction.on_commit(partial(bump_recipe_versions, *recipe_ids))
+
+
+@receiver((post_save, post_delete), sender=Token)
+def token_changed(sender, instance, **kwargs):
+    transaction.on_commit(partial(forget_tokens, instance.key))
+
+
+@receiver(post_save, sender=CustomUser)
+def user_changed(sender, instance, created, update_fields=None, **kwargs):
+    if created or update_fields == frozenset(('last_login',)):
+        return
+    keys = list(Token.objects.filter(user=instance).values_list(
+        'key', flat=True
+    ))
+    if keys:
+        transaction.on_commit(partial(forget_tokens, *keys))
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or {'name', 'text'} & set(update_fields):
+        Recipe.objects.filter(pk=instance.pk).update_search_vector()
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_created(sender, instance, created, **kwargs):
+    if created:
+        change_counter(CustomUser, instance.author_id, 'recipes_count', 1)
+        enqueue('fan_out_recipe', {'recipe_id': instance.pk})
+
+
+@receiver(pre_delete, sender=Recipe)
+@receiver(pre_delete, sender=CustomUser)
+def counted_row_deleting(sender, instance, **kwargs):
+    deleting_started(sender, instance.pk)
+
+
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=CustomUser)
+def counted_row_deleted(sender, instance, **kwargs):
+    deleting_finished(sender, instance.pk)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    if not is_deleting(CustomUser, instance.author_id):
+        change_counter(CustomUser, instance.author_id, 'recipes_count', -1)
+
+
+@receiver(post_save, sender=Favorite)
+def favorite_created(sender, instance, created, **kwargs):
+    if created:
+        change_counter(Recipe, instance.recipe_id, 'favorites_count', 1)
+
+
+@receiver(post_delete, sender=Favorite)
+def favorite_deleted(sender, instance, **kwargs):
+    if not is_deleting(Recipe, instance.recipe_id):
+        change_counter(Recipe, instance.recipe_id, 'favorites_count', -1)
+
+
+@receiver(post_save, sender=Subscribe)
+def subscription_created(sender, instance, created, **kwargs):
+    if created:
+        change_counter(
+            CustomUser, instance.subscribed_to_id, 'subscribers_count', 1
+        )
+        enqueue('fill_timeline', {
+            'user_id': instance.subscriber_id,
+            'author_id': instance.subscribed_to_id,
+        })
+
+
+@receiver(post_delete, sender=Subscribe)
+def subscription_deleted(sender, instance, **kwargs):
+    if is_deleting(CustomUser, instance.subscribed_to_id):
+        return
+    change_counter(
+        CustomUser, instance.subscribed_to_id, 'subscribers_count', -1
+    )
+    unsubscribed(instance.subscriber_id, instance.subscribed_to_id)
+
+
+request_started.connect(check_connections)
+request_started.connect(forget_deleting)
+
+
+@receiver(connection_created)
+def connection_opened(sender, connection, **kwargs):
+    DB_CONNECTIONS_OPENED.labels(connection.alias).inc()
+    install_query_tracking(connection)
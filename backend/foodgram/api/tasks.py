@@ -0,0 +1,47 @@
+from django.core.files.storage import default_storage
+
+from . import feed
+from .caching import bump_recipe_versions
+from .images import delete_with_variants, generate_variants
+from .jobs import job
+from .models import Recipe
+
+
+@job('generate_recipe_variants')
+def generate_recipe_variants(recipe_id):
+    recipe = Recipe.objects.filter(id=recipe_id).first()
+    if recipe is None or not recipe.image:
+        return
+    name = recipe.image.name
+    if not generate_variants(recipe.image):
+        return
+    # Картинку могли заменить, пока нарезались варианты.
+    if Recipe.objects.filter(id=recipe_id, image=name).update(
+        variants_image=name
+    ):
+        bump_recipe_versions(recipe_id)
+
+
+@job('delete_file')
+def delete_file(name):
+    default_storage.delete(name)
+
+
+@job('delete_image')
+def delete_image(name):
+    delete_with_variants(default_storage, name)
+
+
+@job('fan_out_recipe')
+def fan_out_recipe(recipe_id):
+    feed.fan_out_recipe(recipe_id)
+
+
+@job('fill_timeline')
+def fill_timeline(user_id, author_id):
+    feed.fill_timeline(user_id, author_id)
+
+
+@job('fill_author_timelines')
+def fill_author_timelines(author_id):
+    feed.fill_author_timelines(author_id)
@@ -0,0 +1,783 @@
+import base64
+import csv
+import io
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import (
+    AsyncClient,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from .authentication import get_token_cache_key
+from .jobs import claim_job, run_job
+from .models import (
+    CustomUser,
+    Favorite,
+    Ingredient,
+    Job,
+    Recipe,
+    RecipeIngredients,
+    ShopList,
+    Subscribe,
+    Tag,
+    TimelineEntry,
+    Unit,
+)
+from .short_links import CODE_LENGTH, MODULUS, decode_id, encode_id
+
+PAGE_SIZES = (1, 3, 10)
+
+
+def make_image():
+    buffer = io.BytesIO()
+    Image.new('RGB', (8, 8), 'red').save(buffer, format='PNG')
+    return 'data:image/png;base64,' + base64.b64encode(
+        buffer.getvalue()
+    ).decode()
+
+
+RED_IMAGE = make_image()
+
+
+def run_jobs():
+    claimed = claim_job()
+    while claimed is not None:
+        run_job(claimed)
+        claimed = claim_job()
+
+
+class RecipeQueryCountTests(TestCase):
+    """Число SQL-запросов чтения рецептов не зависит от размера страницы."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create(
+            email='reader@example.com', username='reader',
+            first_name='Читатель', last_name='Тестов'
+        )
+        authors = [
+            CustomUser.objects.create(
+                email=f'author{index}@example.com',
+                username=f'author{index}',
+                first_name='Автор', last_name=str(index)
+            )
+            for index in range(3)
+        ]
+        units = [Unit.objects.create(title=title) for title in ('г', 'мл')]
+        ingredients = [
+            Ingredient.objects.create(
+                name=f'ингредиент {index}',
+                measurement_unit=units[index % 2]
+            )
+            for index in range(5)
+        ]
+        tags = [
+            Tag.objects.create(name='Завтрак', slug='breakfast'),
+            Tag.objects.create(name='Обед', slug='lunch'),
+        ]
+        for index in range(12):
+            recipe = Recipe.objects.create(
+                author=authors[index % 3],
+                name=f'Рецепт {index}',
+                image='recipes/test.png',
+                text='Описание',
+                cooking_time=10
+            )
+            recipe.tags.set(tags[:index % 2 + 1])
+            RecipeIngredients.objects.bulk_create(
+                RecipeIngredients(
+                    recipe=recipe,
+                    ingredient=ingredients[(index + offset) % 5],
+                    amount=offset + 1
+                )
+                for offset in range(3)
+            )
+            if index % 3 == 0:
+                Favorite.objects.create(user=cls.user, recipe=recipe)
+            if index % 4 == 0:
+                ShopList.objects.create(user=cls.user, recipe=recipe)
+        Subscribe.objects.create(subscriber=cls.user, subscribed_to=authors[0])
+        cls.recipe = Recipe.objects.first()
+
+    def setUp(self):
+        # Анонимные ответы кешируются: каждый запрос теста должен
+        # доходить до базы.
+        cache.clear()
+        self.anonymous = APIClient()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_anonymous(self):
+        for limit in PAGE_SIZES:
+            with self.subTest(limit=limit), self.assertNumQueries(5):
+                response = self.anonymous.get(
+                    '/api/recipes/', {'limit': limit}
+                )
+            self.assertEqual(len(response.data['results']), limit)
+
+    def test_list_authenticated(self):
+        for limit in PAGE_SIZES:
+            with self.subTest(limit=limit), self.assertNumQueries(6):
+                response = self.client.get('/api/recipes/', {'limit': limit})
+            self.assertEqual(len(response.data['results']), limit)
+
+    def test_detail_anonymous(self):
+        with self.assertNumQueries(4):
+            response = self.anonymous.get(f'/api/recipes/{self.recipe.id}/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_detail_authenticated(self):
+        with self.assertNumQueries(5):
+            response = self.client.get(f'/api/recipes/{self.recipe.id}/')
+        self.assertEqual(response.status_code, 200)
+
+
+class ShoppingListTests(TestCase):
+    """Файл списка покупок во всех форматах, под WSGI и ASGI."""
+
+    url = '/api/recipes/download_shopping_cart/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create(
+            email='buyer@example.com', username='buyer',
+            first_name='Покупатель', last_name='Тестов'
+        )
+        cls.token = Token.objects.create(user=cls.user)
+        grams = Unit.objects.create(title='г')
+        cabbage = Ingredient.objects.create(
+            name='капуста', measurement_unit=grams
+        )
+        carrot = Ingredient.objects.create(
+            name='морковь', measurement_unit=Unit.objects.create(title='шт')
+        )
+        for name, amounts in (
+            ('Щи', ((cabbage, 300), (carrot, 1))),
+            ('Салат', ((cabbage, 200), (carrot, 2))),
+        ):
+            recipe = Recipe.objects.create(
+                author=cls.user, name=name, image='recipes/test.png',
+                text='Описание', cooking_time=30
+            )
+            RecipeIngredients.objects.bulk_create(
+                RecipeIngredients(
+                    recipe=recipe, ingredient=ingredient, amount=amount
+                )
+                for ingredient, amount in amounts
+            )
+            ShopList.objects.create(user=cls.user, recipe=recipe)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def download(self, file_format):
+        response = self.client.get(self.url, {'format': file_format})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response['Content-Disposition'],
+            f'attachment; filename=buyer_shopping_list.{file_format}'
+        )
+        return b''.join(response.streaming_content)
+
+    def test_txt(self):
+        self.assertEqual(
+            self.download('txt').decode(),
+            'Ваш список покупок:\n\nкапуста (г): 500\nморковь (шт): 3\n'
+        )
+
+    def test_csv(self):
+        content = self.download('csv').decode('utf-8-sig')
+        self.assertEqual(list(csv.reader(io.StringIO(content))), [
+            ['Ингредиент', 'Единица измерения', 'Количество'],
+            ['капуста', 'г', '500'],
+            ['морковь', 'шт', '3'],
+        ])
+
+    def test_pdf(self):
+        self.assertTrue(self.download('pdf').startswith(b'%PDF'))
+
+    def test_unknown_format(self):
+        response = self.client.get(self.url, {'format': 'xls'})
+        self.assertEqual(response.status_code, 400)
+
+    async def test_download_under_asgi(self):
+        client = AsyncClient()
+        for file_format in ('txt', 'csv'):
+            response = await client.get(
+                self.url,
+                {'format': file_format},
+                # AsyncClient в Django 3.2 принимает имена заголовков ASGI.
+                authorization=f'Token {self.token.key}'
+            )
+            self.assertEqual(response.status_code, 200)
+            content = b''.join(response.streaming_content).decode()
+            self.assertIn('капуста', content)
+            self.assertIn('500', content)
+
+
+class SubscriptionListTests(TestCase):
+    """recipes_limit в списке подписок."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create(
+            email='fan@example.com', username='fan',
+            first_name='Подписчик', last_name='Тестов'
+        )
+        cls.author = CustomUser.objects.create(
+            email='cook@example.com', username='cook',
+            first_name='Повар', last_name='Тестов'
+        )
+        cls.recipes = [
+            Recipe.objects.create(
+                author=cls.author, name=f'Рецепт {index}',
+                image='recipes/test.png', text='Описание', cooking_time=5
+            )
+            for index in range(3)
+        ]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_without_subscriptions(self):
+        response = self.client.get(
+            '/api/users/subscriptions/', {'recipes_limit': 2}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'], [])
+
+    def test_recipes_limit(self):
+        Subscribe.objects.create(
+            subscriber=self.user, subscribed_to=self.author
+        )
+        response = self.client.get(
+            '/api/users/subscriptions/', {'recipes_limit': 2}
+        )
+        self.assertEqual(response.status_code, 200)
+        recipes = response.data['results'][0]['recipes']
+        self.assertEqual(
+            [recipe['id'] for recipe in recipes],
+            [recipe.id for recipe in self.recipes[:0:-1]]
+        )
+        response = self.client.get(
+            '/api/users/subscriptions/', {'recipes_limit': 2, 'offset': 5}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'], [])
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Пользователь из кеша токенов не затирает счётчики и пароль."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            email='cached@example.com', username='cached',
+            first_name='Кеш', last_name='Тестов', password='pass-1234'
+        )
+        cls.token = Token.objects.create(user=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_cached_user_does_not_overwrite_counters(self):
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 200)
+        Recipe.objects.create(
+            author=self.user, name='Каша', image='recipes/test.png',
+            text='Описание', cooking_time=5
+        )
+        response = self.client.delete('/api/users/me/avatar/')
+        self.assertEqual(response.status_code, 204)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.recipes_count, 1)
+
+    def test_password_hash_is_not_cached(self):
+        self.client.get('/api/users/me/')
+        token = cache.get(get_token_cache_key(self.token.key))
+        self.assertEqual(token.user, self.user)
+        self.assertIn('password', token.user.get_deferred_fields())
+
+    def test_set_password_with_cached_user(self):
+        self.client.get('/api/users/me/')
+        response = self.client.post('/api/users/set_password/', {
+            'current_password': 'pass-1234', 'new_password': 'Nov-pass-5678'
+        })
+        self.assertEqual(response.status_code, 204)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('Nov-pass-5678'))
+
+
+class RecipeImageVariantTests(TestCase):
+    """Варианты картинки рецепта: очередь задач и ссылки в ответах."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create(
+            email='painter@example.com', username='painter',
+            first_name='Художник', last_name='Тестов'
+        )
+        cls.tag = Tag.objects.create(name='Ужин', slug='dinner')
+        cls.ingredient = Ingredient.objects.create(
+            name='свёкла', measurement_unit=Unit.objects.create(title='г')
+        )
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_recipe(self):
+        response = self.client.post('/api/recipes/', {
+            'ingredients': [{'id': self.ingredient.id, 'amount': 100}],
+            'tags': [self.tag.id],
+            'image': RED_IMAGE,
+            'name': 'Борщ',
+            'text': 'Описание',
+            'cooking_time': 60,
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        return Recipe.objects.get(id=response.data['id'])
+
+    def test_create_enqueues_only_variants(self):
+        recipe = self.create_recipe()
+        self.assertTrue(Job.objects.filter(
+            name='generate_recipe_variants', payload={'recipe_id': recipe.id}
+        ).exists())
+        self.assertFalse(Job.objects.filter(name='delete_image').exists())
+
+    def test_variant_url_after_generation(self):
+        recipe = self.create_recipe()
+        url = f'/api/recipes/{recipe.id}/'
+        self.assertTrue(
+            self.client.get(url).data['image'].endswith(recipe.image.url)
+        )
+        run_jobs()
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.variants_image, recipe.image.name)
+        self.assertIn('/variants/', self.client.get(url).data['image'])
+
+
+class ClaimJobTests(TestCase):
+    """Задачи, брошенные упавшим обработчиком."""
+
+    def test_abandoned_job_is_retried(self):
+        job = Job.objects.create(
+            name='delete_file', status=Job.RUNNING, attempts=1,
+            max_attempts=2, run_at=timezone.now()
+        )
+        self.assertEqual(claim_job(), job)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.RUNNING, 2))
+
+    def test_abandoned_job_fails_after_max_attempts(self):
+        job = Job.objects.create(
+            name='delete_file', status=Job.RUNNING, attempts=2,
+            max_attempts=2, run_at=timezone.now()
+        )
+        self.assertIsNone(claim_job())
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+
+
+class CounterTests(TestCase):
+    """Сохранённые счётчики избранного, рецептов и подписчиков."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create(
+            email='counter@example.com', username='counter',
+            first_name='Счётчик', last_name='Тестов'
+        )
+        cls.author = CustomUser.objects.create(
+            email='writer@example.com', username='writer',
+            first_name='Автор', last_name='Тестов'
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            author=self.author, name='Плов', image='recipes/test.png',
+            text='Описание', cooking_time=90
+        )
+
+    def assertCounters(self, favorites, recipes, subscribers):
+        self.recipe.refresh_from_db()
+        self.author.refresh_from_db()
+        self.assertEqual(
+            (
+                self.recipe.favorites_count,
+                self.author.recipes_count,
+                self.author.subscribers_count,
+            ),
+            (favorites, recipes, subscribers)
+        )
+
+    def test_api_create_and_delete(self):
+        self.assertCounters(0, 1, 0)
+        favorite_url = f'/api/recipes/{self.recipe.id}/favorite/'
+        subscribe_url = f'/api/users/{self.author.id}/subscribe/'
+        self.assertEqual(self.client.post(favorite_url).status_code, 201)
+        self.assertEqual(self.client.post(subscribe_url).status_code, 201)
+        self.assertCounters(1, 1, 1)
+        self.assertEqual(self.client.delete(favorite_url).status_code, 204)
+        self.assertEqual(self.client.delete(subscribe_url).status_code, 204)
+        self.assertCounters(0, 1, 0)
+        self.assertEqual(self.client.delete(favorite_url).status_code, 400)
+        self.assertEqual(self.client.delete(subscribe_url).status_code, 400)
+        self.assertCounters(0, 1, 0)
+
+    def test_recipe_delete_skips_favorites_counter(self):
+        for index in range(3):
+            Favorite.objects.create(
+                user=CustomUser.objects.create(
+                    email=f'fan{index}@example.com', username=f'fan{index}'
+                ),
+                recipe=self.recipe
+            )
+        self.assertCounters(3, 1, 0)
+        with CaptureQueriesContext(connection) as queries:
+            self.recipe.delete()
+        self.assertFalse(any(
+            'favorites_count' in query['sql'] for query in queries
+        ))
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.recipes_count, 0)
+
+    def test_user_delete(self):
+        Favorite.objects.create(user=self.user, recipe=self.recipe)
+        Subscribe.objects.create(
+            subscriber=self.user, subscribed_to=self.author
+        )
+        self.assertCounters(1, 1, 1)
+        self.user.delete()
+        self.assertCounters(0, 1, 0)
+        self.author.delete()
+        self.assertFalse(Recipe.objects.exists())
+
+
+class RecipeValidationTests(TestCase):
+    """Ошибки тегов и ингредиентов возвращаются вместе."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create(
+            email='validator@example.com', username='validator',
+            first_name='Проверка', last_name='Тестов'
+        )
+
+    def test_missing_tags_and_ingredients(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.post('/api/recipes/', {
+            'ingredients': [
+                {'id': 404, 'amount': 1}, {'id': 405, 'amount': 1}
+            ],
+            'tags': [404, 405],
+            'image': RED_IMAGE,
+            'name': 'Пустой',
+            'text': 'Описание',
+            'cooking_time': 1,
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, {
+            'tags': ['Несуществующие теги: 404, 405.'],
+            'ingredients': ['Несуществующие ингредиенты: 404, 405.'],
+        })
+
+
+class RecipePaginationTests(TestCase):
+    """Курсорная выдача списка и её отключение для поиска."""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = CustomUser.objects.create(
+            email='soup@example.com', username='soup',
+            first_name='Суп', last_name='Тестов'
+        )
+        cls.by_name = Recipe.objects.create(
+            author=author, name='суп гороховый', image='recipes/test.png',
+            text='Горох и вода', cooking_time=60
+        )
+        cls.by_text = Recipe.objects.create(
+            author=author, name='Обед', image='recipes/test.png',
+            text='Подать суп горячим', cooking_time=30
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cursor(self):
+        response = self.client.get('/api/recipes/', {'cursor': ''})
+        self.assertNotIn('count', response.data)
+        self.assertEqual(
+            [recipe['id'] for recipe in response.data['results']],
+            [self.by_text.id, self.by_name.id]
+        )
+
+    def test_search_ignores_cursor(self):
+        response = self.client.get(
+            '/api/recipes/', {'cursor': '', 'search': 'суп'}
+        )
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(
+            [recipe['id'] for recipe in response.data['results']],
+            [self.by_name.id, self.by_text.id]
+        )
+
+
+class DeduplicateMigrationTests(TransactionTestCase):
+    """Миграция 0005 удаляет дубли перед созданием ограничений."""
+
+    migrate_from = [('api', '0004_recipe_created_id_idx')]
+    migrate_to = [('api', '0005_unique_user_relations')]
+
+    def setUp(self):
+        self.executor = MigrationExecutor(connection)
+        self.executor.migrate(self.migrate_from)
+        self.addCleanup(self.migrate_to_latest)
+
+    def migrate_to_latest(self):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_duplicates_removed(self):
+        apps = self.executor.loader.project_state(self.migrate_from).apps
+        User = apps.get_model('api', 'CustomUser')
+        Recipe = apps.get_model('api', 'Recipe')
+        Favorite = apps.get_model('api', 'Favorite')
+        Subscribe = apps.get_model('api', 'Subscribe')
+        user, author = (
+            User.objects.create(
+                email=f'{name}@example.com', username=name,
+                first_name=name, last_name=name
+            )
+            for name in ('old_user', 'old_author')
+        )
+        recipe = Recipe.objects.create(
+            author=author, name='Рецепт', image='recipes/test.png',
+            text='Описание', cooking_time=1
+        )
+        first = Favorite.objects.create(user=user, recipe=recipe)
+        Favorite.objects.create(user=user, recipe=recipe)
+        Subscribe.objects.create(subscriber=user, subscribed_to=author)
+        Subscribe.objects.create(subscriber=user, subscribed_to=author)
+        Subscribe.objects.create(subscriber=user, subscribed_to=user)
+
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.migrate_to)
+
+        apps = executor.loader.project_state(self.migrate_to).apps
+        self.assertEqual(
+            list(apps.get_model('api', 'Favorite').objects.values_list(
+                'id', flat=True
+            )),
+            [first.id]
+        )
+        self.assertEqual(
+            list(apps.get_model('api', 'Subscribe').objects.values_list(
+                'subscriber', 'subscribed_to'
+            )),
+            [(user.id, author.id)]
+        )
+
+
+class UniqueRelationTests(TestCase):
+    """Повторное добавление возвращает 400, а не 500."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create(
+            email='twice@example.com', username='twice',
+            first_name='Дважды', last_name='Тестов'
+        )
+        cls.author = CustomUser.objects.create(
+            email='once@example.com', username='once',
+            first_name='Однажды', last_name='Тестов'
+        )
+        cls.recipe = Recipe.objects.create(
+            author=cls.author, name='Окрошка', image='recipes/test.png',
+            text='Описание', cooking_time=20
+        )
+
+    def test_repeated_create(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        for url in (
+            f'/api/recipes/{self.recipe.id}/favorite/',
+            f'/api/recipes/{self.recipe.id}/shopping_cart/',
+            f'/api/users/{self.author.id}/subscribe/',
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(client.post(url).status_code, 201)
+                self.assertEqual(client.post(url).status_code, 400)
+
+    def test_self_subscription(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.post(f'/api/users/{self.user.id}/subscribe/')
+        self.assertEqual(response.status_code, 400)
+
+
+class ShortLinkTests(TestCase):
+    """Короткие ссылки на рецепты."""
+
+    def test_round_trip(self):
+        for recipe_id in (1, 2, 61, 62, 12345, MODULUS - 1):
+            with self.subTest(recipe_id=recipe_id):
+                code = encode_id(recipe_id)
+                self.assertEqual(len(code), CODE_LENGTH)
+                self.assertEqual(decode_id(code), recipe_id)
+
+    def test_codes_are_distinct(self):
+        codes = {encode_id(recipe_id) for recipe_id in range(1, 1001)}
+        self.assertEqual(len(codes), 1000)
+
+    def test_invalid_codes(self):
+        for code in ('abc', 'abcdefg', 'abc-de'):
+            with self.subTest(code=code), self.assertRaises(ValueError):
+                decode_id(code)
+        for recipe_id in (0, MODULUS):
+            with self.subTest(recipe_id=recipe_id):
+                with self.assertRaises(ValueError):
+                    encode_id(recipe_id)
+
+    def test_get_link_and_redirect(self):
+        author = CustomUser.objects.create(
+            email='linker@example.com', username='linker',
+            first_name='Ссылка', last_name='Тестов'
+        )
+        recipe = Recipe.objects.create(
+            author=author, name='Блины', image='recipes/test.png',
+            text='Описание', cooking_time=40
+        )
+        response = self.client.get(f'/api/recipes/{recipe.id}/get-link/')
+        self.assertEqual(response.status_code, 200)
+        code = encode_id(recipe.id)
+        self.assertEqual(
+            response.json()['short-link'], f'http://testserver/s/{code}'
+        )
+        response = self.client.get(f'/s/{code}/')
+        self.assertEqual(response.status_code, 301)
+        self.assertEqual(response['Location'], f'/recipes/{recipe.id}')
+
+
+@override_settings(FEED_FANOUT_LIMIT=1)
+class FeedTests(TestCase):
+    """Раскладка рецептов по лентам и курсорное листание ленты."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader, cls.other, cls.author, cls.star = (
+            CustomUser.objects.create(
+                email=f'{name}@example.com', username=name,
+                first_name=name, last_name='Тестов'
+            )
+            for name in ('reader', 'other', 'author', 'star')
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+        # У star два подписчика: больше FEED_FANOUT_LIMIT, его рецепты
+        # не раскладываются, а берутся при чтении.
+        for subscriber, author in (
+            (self.reader, self.author),
+            (self.reader, self.star),
+            (self.other, self.star),
+        ):
+            Subscribe.objects.create(
+                subscriber=subscriber, subscribed_to=author
+            )
+        run_jobs()
+
+    def create_recipes(self, author, *minutes):
+        recipes = []
+        for minute in minutes:
+            recipe = Recipe.objects.create(
+                author=author, name=f'{author.username} {minute}',
+                image='recipes/test.png', text='Описание', cooking_time=5
+            )
+            recipe.created = timezone.now().replace(
+                year=2024, month=1, day=1, hour=12, minute=minute
+            )
+            Recipe.objects.filter(id=recipe.id).update(
+                created=recipe.created
+            )
+            recipes.append(recipe)
+        # Файлов картинок в тестах нет.
+        Job.objects.filter(name='generate_recipe_variants').delete()
+        run_jobs()
+        return recipes
+
+    def read_feed(self, limit):
+        ids, url, params = [], '/api/recipes/feed/', {'limit': limit}
+        # Ограничение на случай курсора, который не продвигается.
+        for _ in range(20):
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.data['results']), limit)
+            ids += [recipe['id'] for recipe in response.data['results']]
+            url, params = response.data['next'], None
+            if url is None:
+                return ids
+        self.fail('Лента не закончилась за 20 страниц')
+
+    def test_fan_out(self):
+        fanned_out = self.create_recipes(self.author, 1)[0]
+        pulled = self.create_recipes(self.star, 2)[0]
+        self.assertEqual(
+            list(TimelineEntry.objects.values_list('user', 'recipe')),
+            [(self.reader.id, fanned_out.id)]
+        )
+        self.assertEqual(self.read_feed(10), [pulled.id, fanned_out.id])
+
+    def test_cursor_paging(self):
+        recipes = (
+            self.create_recipes(self.author, 1, 3, 5, 5, 7)
+            + self.create_recipes(self.star, 2, 3, 6, 7, 8)
+        )
+        expected = [
+            recipe.id for recipe in sorted(
+                recipes,
+                key=lambda recipe: (recipe.created, recipe.id),
+                reverse=True
+            )
+        ]
+        for limit in (1, 2, 3, 10):
+            with self.subTest(limit=limit):
+                self.assertEqual(self.read_feed(limit), expected)
+
+    def test_unsubscribe_and_backfill(self):
+        recipe = self.create_recipes(self.author, 1)[0]
+        url = f'/api/users/{self.author.id}/subscribe/'
+        self.assertEqual(self.client.delete(url).status_code, 204)
+        self.assertEqual(self.read_feed(10), [])
+        self.assertEqual(self.client.post(url).status_code, 201)
+        run_jobs()
+        self.assertEqual(self.read_feed(10), [recipe.id])
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/recipes/feed/', {'cursor': 'xx'})
+        self.assertEqual(response.status_code, 404)
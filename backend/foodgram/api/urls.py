@@ -1,6 +1,9 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import SimpleRouter
 
+from .async_views import async_read_urls, read_view
+from .metrics import metrics_view
 from .views import (
     AvatarViewSet,
     FavoriteViewSet,
@@ -19,10 +22,27 @@ router.register('ingredients', IngredientViewSet)
 router.register('users', UserViewSet)
 router.register('recipes', RecipeViewSet)
 
+ASYNC_READ_ROUTES = (
+    'recipe-list',
+    'recipe-detail',
+    'recipe-feed',
+    'tag-list',
+    'tag-detail',
+    'ingredient-list',
+    'ingredient-detail',
+)
+
+router_urls = router.urls
+short_url_view = RecipeShortURL.as_view()
+if settings.ASYNC_READ_VIEWS:
+    router_urls = async_read_urls(router_urls, ASYNC_READ_ROUTES)
+    short_url_view = read_view(short_url_view)
+
 urlpatterns = [
-    path('', include(router.urls)),
+    path('', include(router_urls)),
     path('auth/', include('djoser.urls')),
     path('auth/', include('djoser.urls.authtoken')),
+    path('metrics', metrics_view, name='metrics'),
     path('users/me/avatar/', AvatarViewSet.as_view(
         {
             'put': 'update_avatar',
@@ -44,7 +64,7 @@ urlpatterns = [
     ), name='shop_list_create_delete'),
     path(
         'recipes/<int:id>/get-link/',
-        RecipeShortURL.as_view(),
+        short_url_view,
         name='shor_url'
     ),
 
@@ -1,26 +1,34 @@
+from functools import partial
+
 from django.contrib.auth import get_user_model
+from django.db.models import (
+    BooleanField,
+    Prefetch,
+    Value,
+    prefetch_related_objects
+)
 from django_filters.rest_framework import DjangoFilterBackend
-from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
 from djoser import views as djoser_views
 from rest_framework import generics, permissions, status, viewsets
 from rest_framework.decorators import action
-from rest_framework.pagination import (
-    LimitOffsetPagination,
-    PageNumberPagination
-)
+from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
-from .filters import IngredientsFilter, RecipeFilter
+from .caching import AnonymousResponseCacheMixin
+from .catalog import CatalogCacheMixin
+from .feed import get_feed_page
+from .filters import RecipeFilter, search_ingredients
+from .jobs import enqueue
 from .models import (
     Favorite,
     Ingredient,
     Recipe,
-    RecipeIngredients,
     ShopList,
     Tag,
 )
+from .pagination import FeedPagination, RecipePagination
 from .permissions import Author
 from .serializers import (
     AvatarSerializer,
@@ -35,24 +43,40 @@ from .serializers import (
     TagSerializer,
     UserSerializer,
 )
+from .shopping_list import (
+    SHOPPING_LIST_FORMATS,
+    ShoppingListNegotiation,
+    shopping_list_response
+)
 
 
 User = get_user_model()
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(CatalogCacheMixin, viewsets.ReadOnlyModelViewSet):
+    catalog_name = 'tags'
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     pagination_class = None
     permission_classes = (permissions.IsAuthenticatedOrReadOnly,)
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = Ingredient.objects.all()
+class IngredientViewSet(CatalogCacheMixin, viewsets.ReadOnlyModelViewSet):
+    catalog_name = 'ingredients'
+    queryset = Ingredient.objects.select_related('measurement_unit')
     serializer_class = IngredientSerializer
     pagination_class = None
-    filter_backends = (DjangoFilterBackend,)
-    filterset_class = IngredientsFilter
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action != 'list':
+            return queryset
+        limit = self.request.query_params.get('limit', '')
+        limit = int(limit) if limit.isdigit() else None
+        name = self.request.query_params.get('name')
+        if name:
+            return search_ingredients(queryset, name, limit)
+        return queryset[:limit]
 
 
 class UserViewSet(djoser_views.UserViewSet):
@@ -70,8 +94,17 @@ class UserViewSet(djoser_views.UserViewSet):
     @action(detail=False, methods=('get',),
             permission_classes=(IsAuthenticated,))
     def subscriptions(self, request):
-        data = User.objects.filter(subscribed_to__subscriber=self.request.user)
+        data = User.objects.filter(
+            subscribed_to__subscriber=request.user
+        ).annotate(
+            is_subscribed=Value(True, output_field=BooleanField())
+        )
         page = self.paginate_queryset(data)
+        recipes = Recipe.objects.filter(author__in=page)
+        limit = request.query_params.get('recipes_limit', '')
+        if limit.isdigit():
+            recipes = recipes.limit_per_author(int(limit))
+        prefetch_related_objects(page, Prefetch('recipes', queryset=recipes))
         serializer = SubscribeListSerializer(
             page,
             many=True,
@@ -83,7 +116,6 @@ class UserViewSet(djoser_views.UserViewSet):
             permission_classes=(IsAuthenticated,))
     def subscribe(self, request, id):
         user = request.user
-        subscribed_to = get_object_or_404(User, pk=id)
 
         if request.method == 'POST':
             data = {'subscriber': user.id, 'subscribed_to': id}
@@ -96,10 +128,10 @@ class UserViewSet(djoser_views.UserViewSet):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
         elif request.method == 'DELETE':
-            subscription = user.subscriber.filter(subscribed_to=subscribed_to)
-            if subscription.exists():
-                subscription.delete()
+            deleted, _ = user.subscriber.filter(subscribed_to_id=id).delete()
+            if deleted:
                 return Response(status=status.HTTP_204_NO_CONTENT)
+            get_object_or_404(User, pk=id)
             return Response(status=status.HTTP_400_BAD_REQUEST)
 
 
@@ -111,30 +143,43 @@ class AvatarViewSet(viewsets.ModelViewSet):
             permission_classes=(IsAuthenticated,))
     def update_avatar(self, request):
         user = request.user
+        old_avatar = user.avatar.name if user.avatar else None
         serializer = AvatarSerializer(user, data=request.data,
                                       partial=True)
         serializer.is_valid(raise_exception=True)
         serializer.save()
+        if old_avatar and old_avatar != user.avatar.name:
+            enqueue('delete_file', {'name': old_avatar})
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     @action(detail=False, methods=('delete',),
             permission_classes=(IsAuthenticated,))
     def delete_avatar(self, request):
         user = request.user
-        user.avatar.delete(save=False)
+        if user.avatar:
+            enqueue('delete_file', {'name': user.avatar.name})
         user.avatar = None
         user.save()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(AnonymousResponseCacheMixin, viewsets.ModelViewSet):
     queryset = Recipe.objects.all()
     permission_classes = (Author, permissions.IsAuthenticatedOrReadOnly)
-    pagination_class = PageNumberPagination
-    PageNumberPagination.page_size_query_param = 'limit'
+    pagination_class = RecipePagination
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
 
+    def get_queryset(self):
+        user = self.request.user
+        return super().get_queryset().with_user_flags(user).with_related(user)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action in ('list', 'feed'):
+            context['image_variant'] = 'card'
+        return context
+
     def get_serializer_class(self):
         if self.action in ('create', 'partial_update'):
             return RecipeCreateSerializer
@@ -143,40 +188,32 @@ class RecipeViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
-    @action(detail=False, methods=('get',))
+    @action(detail=False, methods=('get',),
+            permission_classes=(IsAuthenticated,),
+            pagination_class=FeedPagination)
+    def feed(self, request):
+        recipe_ids = self.paginator.paginate_feed(
+            partial(get_feed_page, request.user), request
+        )
+        recipes = self.get_queryset().in_bulk(recipe_ids)
+        serializer = self.get_serializer(
+            [recipes[pk] for pk in recipe_ids if pk in recipes], many=True
+        )
+        return self.paginator.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=('get',),
+            permission_classes=(IsAuthenticated,),
+            content_negotiation_class=ShoppingListNegotiation)
     def download_shopping_cart(self, request):
-        user = request.user
-        file_name = f'{user.username}_shopping_list.txt'
-        response = HttpResponse(content_type='text/plain')
-        response['Content-Disposition'] = f'attachment; filename={file_name}'
-
-        shop_list = user.shop_user.all()
-
-        file_data = {
-            'Ваш список покупок': '\n\n',
-        }
-        ingredients_summary = {}
-        for item in shop_list:
-            recipe_ingredients = RecipeIngredients.objects.filter(
-                recipe=item.recipe
+        file_format = request.query_params.get('format', 'txt')
+        if file_format not in SHOPPING_LIST_FORMATS:
+            return Response(
+                {'format': 'Доступные форматы: {}.'.format(
+                    ', '.join(SHOPPING_LIST_FORMATS)
+                )},
+                status=status.HTTP_400_BAD_REQUEST
             )
-            for recipe_ingredient in recipe_ingredients:
-                ingredient_name = recipe_ingredient.ingredient.name
-                quantity = recipe_ingredient.amount
-
-                if ingredient_name in ingredients_summary:
-                    ingredients_summary[ingredient_name] += quantity
-                else:
-                    ingredients_summary[ingredient_name] = quantity
-
-        for ingredient, total_quantity in ingredients_summary.items():
-            meas_unit = recipe_ingredient.ingredient.measurement_unit.title
-            file_data[
-                f"{ingredient} ({meas_unit})"] = f"{total_quantity}\n"
-
-        response.write("\n".join(f"{k}: {v}" for k, v in file_data.items()))
-
-        return response
+        return shopping_list_response(request.user, file_format)
 
 
 class FavoriteViewSet(viewsets.ModelViewSet):
@@ -195,17 +232,14 @@ class FavoriteViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=('delete',))
     def remove_from_favorites(self, request, id):
-        user = request.user
-        recipe = get_object_or_404(Recipe, id=id)
-        try:
-            favorite = user.favorites.get(recipe=recipe)
-            favorite.delete()
+        deleted, _ = request.user.favorites.filter(recipe_id=id).delete()
+        if deleted:
             return Response(status=status.HTTP_204_NO_CONTENT)
-        except Favorite.DoesNotExist:
-            return Response(
-                {'detail': 'Favorite not found.'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
+        get_object_or_404(Recipe, id=id)
+        return Response(
+            {'detail': 'Favorite not found.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
 
 
 class ShopViewSet(viewsets.ModelViewSet):
@@ -228,20 +262,17 @@ class ShopViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=('delete',))
     def remove_from_shop_list(self, request, id):
-        user = request.user
-        recipe = get_object_or_404(Recipe, id=id)
-        try:
-            shop = user.shop_user.get(recipe=recipe)
-            shop.delete()
+        deleted, _ = request.user.shop_user.filter(recipe_id=id).delete()
+        if deleted:
             return Response(status=status.HTTP_204_NO_CONTENT)
-        except ShopList.DoesNotExist:
-            return Response(
-                {'detail': 'Recipe not in shop list.'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
+        get_object_or_404(Recipe, id=id)
+        return Response(
+            {'detail': 'Recipe not in shop list.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
 
 
 class RecipeShortURL(generics.RetrieveAPIView):
-    queryset = Recipe.objects.all()
+    queryset = Recipe.objects.only('id')
     serializer_class = ShortURLSerializer
     lookup_field = 'id'